@@ -0,0 +1,204 @@
+"""
+Module that implements the AsyncEppClient class (asyncio, Python 3 only)
+"""
+
+import asyncio
+import logging
+import ssl
+import struct
+from collections import OrderedDict
+
+from .client import EppClient, get_ssl_context, DEFAULT_SSL_PROTOCOL
+from .doc import (EppResponse, EppHello, EppLoginCommand, EppLogoutCommand,
+                  CLTRID_XPATH, ensure_cltrid, run_normalize_hook)
+from .exceptions import EppLoginError, EppConnectionError
+from . import xmlbackend
+
+
+class AsyncEppClient(object):
+    """
+    EPP client running on asyncio streams.
+
+    Unlike `EppClient`, ``send()`` does not hold the connection for the whole
+    round trip: the command is written right away and a background reader task
+    hands each response to the coroutine waiting for the matching clTRID. Any
+    number of coroutines can therefore keep commands in flight on one session.
+    """
+    # pylint: disable=too-many-instance-attributes
+    # pylint: disable=too-many-arguments
+
+    def __init__(self, host=None, port=700,
+                 ssl_enable=True, ssl_keyfile=None, ssl_certfile=None, ssl_cacerts=None,
+                 ssl_version=None, ssl_ciphers=None,
+                 ssl_validate_hostname=True, socket_connect_timeout=15,
+                 ssl_validate_cert=True, ssl_context=None):
+        self.host = host
+        self.port = port
+        self.ssl_enable = ssl_enable
+        self.ssl_version = ssl_version or DEFAULT_SSL_PROTOCOL
+        self.ssl_ciphers = ssl_ciphers
+        self.keyfile = ssl_keyfile
+        self.certfile = ssl_certfile
+        self.cacerts = ssl_cacerts
+        self.socket_connect_timeout = socket_connect_timeout
+        self.validate_hostname = ssl_validate_hostname
+        self.validate_cert = ssl_validate_cert
+        self.ssl_context = ssl_context
+        self.log = logging.getLogger(__name__)
+        self.reader = None
+        self.writer = None
+        self.greeting = None
+        # clTRID (or a placeholder for commands without one) -> future, in send order
+        self._pending = OrderedDict()
+        self._reader_task = None
+
+    async def connect(self, host=None, port=None):
+        """
+        Open the connection, read the greeting and start the reader task
+        """
+        host = host or self.host
+        port = port or self.port
+        kwargs = {}
+        if self.ssl_enable:
+            if self.ssl_context is None:
+                self.ssl_context = get_ssl_context(
+                    keyfile=self.keyfile, certfile=self.certfile, cacerts=self.cacerts,
+                    ssl_version=self.ssl_version, ciphers=self.ssl_ciphers,
+                    validate_cert=self.validate_cert,
+                    validate_hostname=self.validate_hostname)
+            kwargs['ssl'] = self.ssl_context
+            kwargs['server_hostname'] = host
+        try:
+            self.reader, self.writer = await asyncio.wait_for(
+                asyncio.open_connection(host, port, **kwargs),
+                self.socket_connect_timeout)
+        except ssl.CertificateError as exp:
+            self.log.exception("SSL certificate verification failed")
+            raise EppConnectionError(str(exp))
+        self.log.debug('connected remote=%s:%s', host, port)
+        self.greeting = EppResponse.from_xml(await self.read())
+        self._reader_task = asyncio.ensure_future(self._read_loop())
+
+    async def read(self):
+        """
+        Read one frame and return its payload
+        """
+        try:
+            siz = await self.reader.readexactly(4)
+        except asyncio.IncompleteReadError:
+            raise IOError("No size header read")
+        siz = struct.unpack(">I", siz)[0] - 4
+        try:
+            return await self.reader.readexactly(siz)
+        except asyncio.IncompleteReadError as exp:
+            raise IOError(
+                "Short / no data read (expected %d bytes, got %d)" %
+                (siz, len(exp.partial)))
+
+    def write(self, data):
+        if isinstance(data, str):
+            data = str.encode(data)
+        self.writer.writelines((struct.pack(">I", 4 + len(data)), data))
+
+    async def _read_loop(self):
+        try:
+            while True:
+                root = xmlbackend.fromstring(await self.read())
+                self._dispatch(root)
+        except asyncio.CancelledError:
+            raise
+        except Exception as exp:  # pylint: disable=broad-except
+            if self._pending:
+                self.log.error("reader stopped with %d command(s) in flight: %s",
+                               len(self._pending), exp)
+            self._fail_pending(exp)
+
+    def _dispatch(self, root):
+        cltrid = root.findtext(CLTRID_XPATH)
+        fut = self._pending.pop(cltrid, None)
+        if fut is None:
+            # no (known) clTRID, e.g. a greeting or a syntax error:
+            # servers answer in order, so it belongs to the oldest command
+            if not self._pending:
+                self.log.warning("discarding unsolicited response (clTRID=%s)", cltrid)
+                return
+            _, fut = self._pending.popitem(last=False)
+        if not fut.done():
+            fut.set_result(root)
+
+    def _fail_pending(self, exp):
+        pending, self._pending = self._pending, OrderedDict()
+        for fut in pending.values():
+            if not fut.done():
+                fut.set_exception(exp)
+
+    async def send(self, doc, extra_nsmap=None, strip_hints=True):
+        """
+        Write ``doc`` and wait for its response
+        """
+        if self._reader_task is None or self._reader_task.done():
+            raise IOError("Not connected")
+        key = ensure_cltrid(doc)
+        if key is None:
+            key = object()
+        elif key in self._pending:
+            raise ValueError("clTRID %s is already in flight" % key)
+        fut = asyncio.get_event_loop().create_future()
+        self._pending[key] = fut
+        try:
+            self.write(doc.to_xml(force_prefix=True))
+            await self.writer.drain()
+        except Exception:
+            self._pending.pop(key, None)
+            raise
+        root = await fut
+        resp = EppClient.parse_response(root, doc, extra_nsmap, strip_hints)
+        run_normalize_hook(doc, resp)
+        return resp
+
+    async def hello(self):
+        return await self.send(EppHello())
+
+    # pylint: disable=c0103
+
+    async def login(self, clID, pw, newPW=None, raise_on_fail=True,
+                    obj_uris=None, extra_obj_uris=None, extra_ext_uris=None, clTRID=None):
+        if self.writer is None:
+            await self.connect(self.host, self.port)
+
+        cmd = EppLoginCommand(
+            obj_uris=obj_uris,
+            extra_obj_uris=extra_obj_uris,
+            extra_ext_uris=extra_ext_uris)
+        cmd.clID = clID
+        cmd.pw = pw
+        if clTRID:
+            cmd['epp']['command']['clTRID'] = clTRID
+        if newPW:
+            cmd.newPW = newPW
+        r = await self.send(cmd)
+        if not r.success and raise_on_fail:
+            raise EppLoginError(r)
+        return r
+
+    async def logout(self, clTRID=None):
+        cmd = EppLogoutCommand()
+        if clTRID:
+            cmd['epp']['command']['clTRID'] = clTRID
+        return await self.send(cmd)
+
+    # pylint: enable=c0103
+
+    async def close(self):
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+            try:
+                await self._reader_task
+            except asyncio.CancelledError:
+                pass
+            self._reader_task = None
+        self._fail_pending(IOError("Connection closed"))
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+            self.reader = None
@@ -11,19 +11,80 @@ except ImportError:
     import ssl
 
 import struct
-from collections import deque
+from collections import deque, namedtuple, OrderedDict
 import logging
-from six import PY2, PY3
+from six import PY2, PY3, text_type
 from past.builtins import xrange # Python 2 backwards compatibility
 from .exceptions import EppLoginError, EppConnectionError
+from . import xmlbackend
+from .framing import HEADER, FrameReader, FrameError, send_buffers
+from .trace import LazyText
+from .timing import PhaseTimings
+from .status import parse_status
+from .records import decode_response
 from .doc import (EppResponse, EppHello, EppLoginCommand, EppLogoutCommand,
                   EppCreateCommand, EppUpdateCommand, EppRenewCommand,
-                  EppTransferCommand, EppDeleteCommand)
-from .utils import gen_trid
-try:
-    from ssl import match_hostname, CertificateError
-except ImportError:
-    from backports.ssl_match_hostname import match_hostname, CertificateError
+                  EppTransferCommand, EppDeleteCommand, command_type, ensure_cltrid,
+                  run_normalize_hook)
+from .utils import gen_trid, monotonic
+
+
+# outcome of one command sent with `EppClient.windowsend`: ``response`` is None
+# if the command failed to be sent or answered, in which case ``error`` holds
+# the exception. ``latency`` is the time between the write and its response.
+BatchResult = namedtuple('BatchResult', ['response', 'error', 'latency'])
+
+# negotiates the best protocol version both ends support (TLSv1 and above).
+# PROTOCOL_TLS_CLIENT is missing on old Pythons, and PROTOCOL_SSLv23 (its
+# former name) is deprecated since Python 3.10
+if hasattr(ssl, 'PROTOCOL_TLS_CLIENT'):
+    DEFAULT_SSL_PROTOCOL = ssl.PROTOCOL_TLS_CLIENT
+else:
+    DEFAULT_SSL_PROTOCOL = ssl.PROTOCOL_SSLv23
+
+# SSL contexts shared by all clients with the same TLS configuration
+_SSL_CONTEXTS = {}
+# (context, host, port) -> last TLS session, offered for resumption on the next connection
+_SSL_SESSIONS = {}
+
+
+def _payload(doc):
+    # what ``batchsend`` writes: strings as they are, documents as XML
+    if isinstance(doc, (bytes, text_type)):
+        return doc
+    return bytes(doc)
+
+
+# pylint: disable=too-many-arguments
+def get_ssl_context(keyfile=None, certfile=None, cacerts=None, ssl_version=None,
+                    ciphers=None, validate_cert=True, validate_hostname=True):
+    """
+    Return the `SSLContext` for the given configuration. Contexts are created
+    once (loading the key, certificate and CA files) and then shared.
+    """
+    ssl_version = ssl_version or DEFAULT_SSL_PROTOCOL
+    key = (keyfile, certfile, cacerts, ssl_version, ciphers, validate_cert, validate_hostname)
+    ctx = _SSL_CONTEXTS.get(key)
+    if ctx is not None:
+        return ctx
+
+    ctx = ssl.SSLContext(ssl_version)
+    if ciphers:
+        ctx.set_ciphers(ciphers)
+    if certfile:
+        ctx.load_cert_chain(certfile, keyfile)
+    if validate_cert:
+        ctx.verify_mode = ssl.CERT_REQUIRED
+        if cacerts:
+            ctx.load_verify_locations(cacerts)
+        else:
+            ctx.load_default_certs()
+        ctx.check_hostname = validate_hostname
+    else:
+        ctx.check_hostname = False
+        ctx.verify_mode = ssl.CERT_NONE
+    return _SSL_CONTEXTS.setdefault(key, ctx)
+# pylint: enable=too-many-arguments
 
 
 class EppClient(object):
@@ -37,13 +98,14 @@ class EppClient(object):
                  ssl_enable=True, ssl_keyfile=None, ssl_certfile=None, ssl_cacerts=None,
                  ssl_version=None, ssl_ciphers=None,
                  ssl_validate_hostname=True, socket_timeout=60, socket_connect_timeout=15,
-                 ssl_validate_cert=True):
+                 ssl_validate_cert=True, read_bufsize=65536, max_frame_size=None,
+                 ssl_context=None, stream_parse=False, wire_trace=None, codec=None,
+                 timing=None, tcp_nodelay=True, tcp_keepalive=None, so_sndbuf=None,
+                 so_rcvbuf=None, pretty_xml=True, lazy_responses=False):
         self.host = host
         self.port = port
         self.ssl_enable = ssl_enable
-        # PROTOCOL_SSLv23 gives the best proto version available (including TLSv1 and above)
-        # SSLv2 should be disabled by most OpenSSL build
-        self.ssl_version = ssl_version or ssl.PROTOCOL_SSLv23
+        self.ssl_version = ssl_version or DEFAULT_SSL_PROTOCOL
         # `ssl_ciphers`, if given, should be a string
         # (https://www.openssl.org/docs/apps/ciphers.html)
         # if not given, use the default in Python version (`ssl._DEFAULT_CIPHERS`)
@@ -54,50 +116,117 @@ class EppClient(object):
         self.socket_timeout = socket_timeout
         self.socket_connect_timeout = socket_connect_timeout
         self.validate_hostname = ssl_validate_hostname
+        self.validate_cert = ssl_validate_cert
+        # if not given, the shared context for the settings above is used
+        self.ssl_context = ssl_context
         self.log = logging.getLogger(__name__)
+        self.read_bufsize = read_bufsize
+        # upper bound for the 4-byte length header of incoming frames
+        self.max_frame_size = max_frame_size
+        # parse responses while they are being received instead of after
+        self.stream_parse = stream_parse
+        # e.g. a `eppy.trace.WireTrace`, gets every exchange made with ``send``
+        self.wire_trace = wire_trace
+        # e.g. a `eppy.offload.ProcessCodec` to serialize and parse in other processes
+        self.codec = codec
+        # e.g. a `eppy.timing.HistogramSink`, gets the `PhaseTimings` of every ``send``
+        self.timing = timing
+        # disable Nagle's algorithm: small pipelined frames go out at once
+        self.tcp_nodelay = tcp_nodelay
+        # True, or (idle, interval, count) in seconds / probes where supported
+        self.tcp_keepalive = tcp_keepalive
+        # socket buffer sizes in bytes, OS defaults if None
+        self.so_sndbuf = so_sndbuf
+        self.so_rcvbuf = so_rcvbuf
+        # False sends compact UTF-8 XML without indentation
+        self.pretty_xml = pretty_xml
+        # convert <resData> and <extension> of responses only when accessed
+        self.lazy_responses = lazy_responses
         self.sock = None
+        # header and payload go out with one sendmsg call (plain TCP only)
+        self._vectored = False
+        self.frame_reader = None
         self.greeting = None
-
-        if ssl_validate_cert:
-            self.cert_required = ssl.CERT_REQUIRED
-        else:
-            self.cert_required = ssl.CERT_NONE
+        self._ssl_session_key = None
+        self._remote_info = None
 
     def connect(self, host=None, port=None, address_family=None):
         """
         Method that initiates a connection to an EPP host
         """
         host = host or self.host
+        port = port or self.port
         self.sock = socket.socket(address_family or socket.AF_INET, socket.SOCK_STREAM)
+        self._tune_socket()
         self.sock.settimeout(self.socket_connect_timeout)  # connect timeout
-        self.sock.connect((host, port or self.port))
+        self.sock.connect((host, port))
         local_sock_addr = self.sock.getsockname()
         local_addr, local_port = local_sock_addr[:2]
-        self.log.debug('connected local=%s:%s remote=%s:%s',
-                       local_addr, local_port, self.sock.getpeername()[0], port)
+        self._remote_info = '{}:{}'.format(*self.sock.getpeername())
+        self.log.debug('connected local=%s:%s remote=%s',
+                       local_addr, local_port, self._remote_info)
         self.sock.settimeout(self.socket_timeout)  # regular timeout
         if self.ssl_enable:
-            self.sock = ssl.wrap_socket(self.sock, self.keyfile, self.certfile,
-                                        ssl_version=self.ssl_version,
-                                        ciphers=self.ssl_ciphers,
-                                        server_side=False,
-                                        cert_reqs=self.cert_required,
-                                        ca_certs=self.cacerts)
-            self.log.debug('%s negotiated with local=%s:%s remote=%s:%s', self.sock.version(),
-                           local_addr, local_port, self.sock.getpeername()[0], port)
-            if self.validate_hostname:
-                try:
-                    match_hostname(self.sock.getpeercert(), host)
-                except CertificateError as exp:
-                    self.log.exception("SSL hostname mismatch")
-                    raise EppConnectionError(str(exp))
-        self.greeting = EppResponse.from_xml(self.read().decode('utf-8'))
+            self._ssl_handshake(host, port)
+            self.log.debug('%s negotiated with local=%s:%s remote=%s (resumed=%s)',
+                           self.sock.version(), local_addr, local_port, self._remote_info,
+                           getattr(self.sock, 'session_reused', False))
+        self._vectored = not self.ssl_enable and hasattr(self.sock, 'sendmsg')
+        self.frame_reader = FrameReader(self.sock, bufsize=self.read_bufsize,
+                                        max_frame_size=self.max_frame_size)
+        self.greeting = EppResponse.from_xml(self.read_frame())
+        # TLS 1.3 session tickets arrive after the handshake, so the session
+        # is only worth saving once something has been read
+        self._save_ssl_session()
+
+    def _tune_socket(self):
+        """
+        Apply the socket options given to the constructor. Buffer sizes are
+        set before connecting so that the TCP window scale accounts for them.
+        """
+        sock = self.sock
+        if self.tcp_nodelay:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        if self.so_sndbuf:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, self.so_sndbuf)
+        if self.so_rcvbuf:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, self.so_rcvbuf)
+        if self.tcp_keepalive:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+            if isinstance(self.tcp_keepalive, tuple):
+                # per-socket tuning is not available everywhere (e.g. TCP_KEEPIDLE on macOS)
+                for opt, value in zip(('TCP_KEEPIDLE', 'TCP_KEEPINTVL', 'TCP_KEEPCNT'),
+                                      self.tcp_keepalive):
+                    if hasattr(socket, opt):
+                        sock.setsockopt(socket.IPPROTO_TCP, getattr(socket, opt), value)
+
+    def _ssl_handshake(self, host, port):
+        if self.ssl_context is None:
+            self.ssl_context = get_ssl_context(
+                keyfile=self.keyfile, certfile=self.certfile, cacerts=self.cacerts,
+                ssl_version=self.ssl_version, ciphers=self.ssl_ciphers,
+                validate_cert=self.validate_cert, validate_hostname=self.validate_hostname)
+        self._ssl_session_key = (self.ssl_context, host, port)
+        kwargs = {}
+        session = _SSL_SESSIONS.get(self._ssl_session_key)
+        if session is not None:
+            kwargs['session'] = session
+        try:
+            self.sock = self.ssl_context.wrap_socket(self.sock, server_hostname=host, **kwargs)
+        except ssl.CertificateError as exp:
+            self.log.exception("SSL certificate verification failed")
+            raise EppConnectionError(str(exp))
+
+    def _save_ssl_session(self):
+        session = getattr(self.sock, 'session', None)
+        if session is not None:
+            _SSL_SESSIONS[self._ssl_session_key] = session
 
     def remote_info(self):
         """
         Method that returns the remote peer name
         """
-        return '{}:{}'.format(*self.sock.getpeername())
+        return self._remote_info or '{}:{}'.format(*self.sock.getpeername())
 
     def hello(self, log_send_recv=False):
         """
@@ -135,66 +264,167 @@ class EppClient(object):
 
     # pylint: enable=c0103
 
+    def read_frame(self):
+        """
+        Read a frame and return its payload as a ``memoryview`` into the
+        receive buffer. It is only valid until the next read.
+        """
+        try:
+            return self.frame_reader.read_frame()
+        except FrameError:
+            self.close()
+            raise
+
     def read(self):
-        recvmeth = self.sock.read if self.ssl_enable else self.sock.recv
-        siz = b''
-        while len(siz) < 4:
-            siz += recvmeth(4 - len(siz))
-            if not siz:
-                # empty string after read means EOF
-                self.close()
-                raise IOError("No size header read")
-
-        size_remaining = siz = struct.unpack(">I", siz)[0] - 4
-        data = b''
-        while size_remaining:
-            buf = recvmeth(size_remaining)
-            if not buf:
-                self.close()
-                raise IOError(
-                    "Short / no data read (expected %d bytes, got %d)" %
-                    (siz, len(data)))
-            size_remaining -= len(buf)
-            data += buf
+        return self.read_frame().tobytes()
 
-        return data
-        #self.log.debug("read total %d bytes:\n%s\n" % (siz+4, data))
+    def read_element(self):
+        """
+        Read a frame and return it parsed as an element (see
+        `eppy.xmlbackend`). The
+        payload is fed to the parser as it arrives, so parsing overlaps with
+        receiving. If the payload is not well-formed, the parser error is
+        raised once the whole frame has been read, so the connection can
+        still be used.
+        """
+        parser = xmlbackend.feed_parser()
+        try:
+            self.frame_reader.feed_frame(parser.feed)
+        except FrameError:
+            self.close()
+            raise
+        return parser.close()
+
+    def _write_buffers(self, buffers):
+        if self._vectored:
+            send_buffers(self.sock, buffers)
+        else:
+            # SSL sockets have no sendmsg: one joined buffer makes one TLS record
+            writemeth = self.sock.write if self.ssl_enable else self.sock.sendall
+            writemeth(b''.join(buffers))
 
     def write(self, data):
-        writemeth = self.sock.write if self.ssl_enable else self.sock.sendall
-        siz = struct.pack(">I", 4 + len(data))
-
-        if PY3:
-            datad = str.encode(data) if type(data) is str else data
-            writemeth(siz + datad)
-        else:
-            writemeth(siz + data)
+        if PY3 and type(data) is str:
+            data = str.encode(data)
+        self._write_buffers((HEADER.pack(4 + len(data)), data))
 
     def write_many(self, docs):
         """
         For testing only.
         Writes multiple documents at once
         """
-        writemeth = self.sock.write if self.ssl_enable else self.sock.sendall
         buf = []
         for doc in docs:
-            buf.append(struct.pack(">I", 4 + len(doc)))
+            if PY3 and type(doc) is str:
+                doc = str.encode(doc)
+            buf.append(HEADER.pack(4 + len(doc)))
             buf.append(doc)
-        writemeth(b''.join(buf))
+        self._write_buffers(buf)
 
     def send(self, doc, log_send_recv=True, extra_nsmap=None, strip_hints=True):
+        timing = self.timing
+        if timing is not None:
+            t_start = monotonic()
         self._gen_cltrid(doc)
-        buf = doc.to_xml(force_prefix=True)
+        if self.codec is not None:
+            buf = self.codec.serialize(doc, pretty=self.pretty_xml)
+        else:
+            buf = doc.to_xml(force_prefix=True, pretty=self.pretty_xml)
+        log_send_recv = log_send_recv and self.log.isEnabledFor(logging.DEBUG)
         if log_send_recv:
-            self.log.debug("SEND %s: %s", self.remote_info(), buf.decode('utf-8'))
+            self.log.debug("SEND %s: %s", self.remote_info(), LazyText(buf))
+        if timing is not None:
+            t_serialized = monotonic()
         self.write(buf)
-        r_buf = self.read().decode('utf-8')
+        if timing is not None:
+            t_written = monotonic()
+            r_size = self._wait_frame()
+            t_received = monotonic()
+        if self.codec is not None:
+            r_buf = self.read_frame()
+            if timing is not None:
+                t_read = monotonic()
+            resp = self.codec.parse(r_buf, extra_nsmap=extra_nsmap, strip_hints=strip_hints)
+        elif self.stream_parse:
+            r_buf = root = self.read_element()
+            if timing is not None:
+                t_read = monotonic()
+            resp = self.parse_response(root, doc, extra_nsmap, strip_hints,
+                                       lazy=self.lazy_responses)
+        else:
+            r_buf = self.read_frame()
+            if timing is not None:
+                t_read = monotonic()
+            resp = self.parse_response(r_buf, doc, extra_nsmap, strip_hints,
+                                       lazy=self.lazy_responses)
+        if timing is not None:
+            t_parsed = monotonic()
+        if self.codec is not None:
+            # the codec parses without the normalizers of the command
+            doc.normalize_response(resp)
+        else:
+            run_normalize_hook(doc, resp)
+        if timing is not None:
+            t_normalized = monotonic()
         if log_send_recv:
-            self.log.debug("RECV %s: %s", self.remote_info(), r_buf)
-        resp = EppResponse.from_xml(r_buf, extra_nsmap=extra_nsmap)
-        if strip_hints:
-            self.strip_hints(resp)
-        doc.normalize_response(resp)
+            self.log.debug("RECV %s: %s", self.remote_info(), LazyText(r_buf))
+        if self.wire_trace is not None:
+            self.wire_trace.record(self.remote_info(), buf, r_buf, resp)
+        if timing is not None:
+            timing.record(PhaseTimings(
+                command_type(doc), resp.code, len(buf), r_size,
+                t_serialized - t_start, t_written - t_serialized, t_received - t_written,
+                t_read - t_received, t_parsed - t_read, t_normalized - t_parsed))
+        return resp
+
+    def send_records(self, doc, decoders=None):
+        """
+        Send ``doc`` and return an `eppy.records.RecordResponse`: the result
+        and the typed records of <resData>, decoded from the element tree
+        without building an `EppResponse`
+        """
+        self._gen_cltrid(doc)
+        buf = doc.to_xml(force_prefix=True, pretty=self.pretty_xml)
+        self.write(buf)
+        if self.stream_parse:
+            r_buf = root = self.read_element()
+        else:
+            r_buf = self.read_frame()
+            root = xmlbackend.fromstring(r_buf)
+        resp = decode_response(root, decoders)
+        if self.wire_trace is not None:
+            self.wire_trace.record(self.remote_info(), buf, r_buf, resp)
+        return resp
+
+    def _wait_frame(self):
+        """
+        Block until the header of the next frame is received and return the
+        size of its payload
+        """
+        try:
+            return self.frame_reader.frame_size()
+        except FrameError:
+            self.close()
+            raise
+
+    @staticmethod
+    def parse_response(buf, doc, extra_nsmap=None, strip_hints=True, lazy=False):
+        """
+        Parse the response to ``doc`` from a frame or an already parsed
+        element, stripping hints and applying the response normalizers of
+        ``doc`` while the tree is built (see `EppResponse.from_element` for
+        ``lazy``)
+        """
+        # pylint: disable=w0212
+        normalizers = doc._plan.response_normalizers
+        if isinstance(buf, (bytes, bytearray, memoryview)):
+            resp = EppResponse.from_xml(buf, extra_nsmap=extra_nsmap, strip_hints=strip_hints,
+                                        normalizers=normalizers, lazy=lazy)
+        else:
+            resp = EppResponse.from_element(buf, extra_nsmap=extra_nsmap,
+                                            strip_hints=strip_hints, normalizers=normalizers,
+                                            lazy=lazy)
+        resp.__dict__['_normalized'] = True
         return resp
 
     @staticmethod
@@ -221,21 +451,29 @@ class EppClient(object):
                                 stack.append(elem)
         return data
 
-    def batchsend(self, docs, readresponse=True, failfast=True, pipeline=False):
+    def batchsend(self, docs, readresponse=True, failfast=True, pipeline=False,
+                  status_only=False):
         """ Send multiple documents. If ``pipeline`` is True, it will
         send it in a single ``write`` call (which may have the effect
         of having more than one doc packed into a single TCP packet
-        if they fits) """
+        if they fits)
+
+        With ``status_only``, responses with a result code below 2000 are
+        returned as `eppy.status.StatusResponse` (code and transaction ids
+        scanned from the frame, without parsing it).
+
+        See ``windowsend`` for a bounded pipeline that matches responses
+        by clTRID. """
         sent = 0
         recved = 0
         ndocs = len(docs)
         try:
             if pipeline:
-                self.write_many(docs)
+                self.write_many([_payload(doc) for doc in docs])
                 sent = ndocs
             else:
                 for doc in docs:
-                    self.write(str(doc))
+                    self.write(_payload(doc))
                     sent += 1
         # pylint: disable=w0702
         except:
@@ -249,9 +487,9 @@ class EppClient(object):
 
         try:
             out = []
+            parse = parse_status if status_only else EppResponse.from_xml
             for _ in xrange(sent):
-                r_buf = self.read()
-                out.append(EppResponse.from_xml(r_buf))
+                out.append(parse(self.read_frame()))
                 recved += 1
         # pylint: disable=w0702
         except Exception as exp:
@@ -263,6 +501,91 @@ class EppClient(object):
         # pylint: enable=w0702
         return out
 
+    def windowsend(self, docs, window=10, extra_nsmap=None, strip_hints=True,
+                   status_only=False):
+        """
+        Pipeline ``docs`` with at most ``window`` commands in flight: a new
+        command is written each time a response arrives. Responses are matched
+        to commands by clTRID (one is generated for commands without it).
+        ``status_only`` is as for ``batchsend`` (frames are then read whole,
+        even with ``stream_parse``).
+
+        Returns a list of `BatchResult`, in the same order as ``docs``. A
+        command that could not be serialized gets its exception in ``error``,
+        as does the oldest command in flight when a response cannot be
+        parsed; if the connection fails, every command still outstanding or
+        not yet sent gets the connection error.
+        """
+        docs = list(docs)
+        results = [None] * len(docs)
+        inflight = OrderedDict()  # clTRID -> (index, write time, request)
+        nxt = 0
+        try:
+            while nxt < len(docs) or inflight:
+                while nxt < len(docs) and len(inflight) < window:
+                    doc = docs[nxt]
+                    try:
+                        key = ensure_cltrid(doc)
+                        if key is None:
+                            # matched by position only
+                            key = object()
+                        elif key in inflight:
+                            raise ValueError("clTRID %s is already in flight" % key)
+                        buf = doc.to_xml(force_prefix=True, pretty=self.pretty_xml)
+                    except Exception as exp:  # pylint: disable=broad-except
+                        results[nxt] = BatchResult(None, exp, None)
+                    else:
+                        self.write(buf)
+                        inflight[key] = (nxt, monotonic(), buf)
+                    nxt += 1
+                if not inflight:
+                    break
+
+                # the command is only known once the response is parsed, so
+                # its normalizers are applied afterwards
+                try:
+                    if status_only:
+                        r_buf = self.read_frame()
+                        resp = parse_status(r_buf, extra_nsmap=extra_nsmap,
+                                            strip_hints=strip_hints)
+                    elif self.stream_parse:
+                        r_buf = self.read_element()
+                        resp = EppResponse.from_element(r_buf, extra_nsmap=extra_nsmap,
+                                                        strip_hints=strip_hints,
+                                                        lazy=self.lazy_responses)
+                    else:
+                        r_buf = self.read_frame()
+                        resp = EppResponse.from_xml(r_buf, extra_nsmap=extra_nsmap,
+                                                    strip_hints=strip_hints,
+                                                    lazy=self.lazy_responses)
+                except (IOError, OSError):
+                    raise
+                except Exception as exp:  # pylint: disable=broad-except
+                    # the frame was read whole but cannot be parsed: without
+                    # its clTRID, it is taken as the answer to the oldest command
+                    _, (idx, started, _) = inflight.popitem(last=False)
+                    self.log.error("Unreadable response in pipeline: %s", exp)
+                    results[idx] = BatchResult(None, exp, monotonic() - started)
+                    continue
+                entry = inflight.pop(resp.cltrid, None)
+                if entry is None:
+                    # no (known) clTRID: servers answer in order
+                    _, entry = inflight.popitem(last=False)
+                idx, started, buf = entry
+                if self.wire_trace is not None:
+                    self.wire_trace.record(self.remote_info(), buf, r_buf, resp)
+                if isinstance(resp, EppResponse):
+                    docs[idx].normalize_response(resp)
+                results[idx] = BatchResult(resp, None, monotonic() - started)
+        except (IOError, OSError) as exp:
+            self.log.error("Pipeline aborted with %d command(s) in flight and %d unsent: %s",
+                           len(inflight), len(docs) - nxt, exp)
+            for idx, _, _ in inflight.values():
+                results[idx] = BatchResult(None, exp, None)
+            for idx in xrange(nxt, len(docs)):
+                results[idx] = BatchResult(None, exp, None)
+        return results
+
     def write_split(self, data):
         """
         For testing only.
@@ -303,8 +626,11 @@ class EppClient(object):
         writemeth(data[4:])
 
     def close(self):
+        if self.ssl_enable:
+            self._save_ssl_session()
         self.sock.close()
         self.sock = None
+        self.frame_reader = None
 
     @staticmethod
     def _gen_cltrid(doc):
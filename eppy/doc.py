@@ -1,10 +1,10 @@
 # pylint: disable=C0111
 
 import copy
-from eppy.xmldict import XmlDictObject
+from eppy.xmldict import XmlDictObject, ChildOrder, Deferred, xml2dict
 from eppy.xmldict import _BASE_NSMAP
 from past.builtins import unicode, basestring # Python 2 backwards compatibility
-from six import iteritems, PY2, PY3
+from six import iteritems, add_metaclass, PY2, PY3
 from . import childorder
 from .utils import gen_trid
 
@@ -30,31 +30,120 @@ EPP_NSMAP.update({
     'mark': 'urn:ietf:params:xml:ns:mark-1.0',
     'changePoll': 'urn:ietf:params:xml:ns:changePoll-1.0',
 })
+# ElementTree path of the clTRID in a parsed response (relative to the <epp> root)
+CLTRID_XPATH = '{0}response/{0}trID/{0}clTRID'.format('{%s}' % EPP_NSMAP['epp'])
 
+def dpath_get(dct, path, default=None):
+    default = {} if default is None else default
+    cur = dct
+    for pat in path:
+        cur = cur.get(pat, default)
+    return cur
+
+
+def dpath_make(path):
+    out = {}
+    cur = out
+    for pat in path:
+        cur[pat] = {}
+        cur = cur[pat]
+    return out
+
+
+RESDATA_PATH = ('epp', 'response', 'resData')
+
+
+def text_node(value):
+    """
+    response normalizer for elements that may have attributes: always a
+    dict, with the text as ``_text``
+    """
+    return value if isinstance(value, dict) else {'_text': value}
+
+
+def _copy_skeleton(dct):
+    # the skeleton is only made of dicts; `_order` and `_nsmap` values are shared
+    return dict((key, _copy_skeleton(val) if isinstance(val, dict) and key != '_nsmap' else val)
+                for key, val in iteritems(dct))
+
+
+class DocPlan(object):
+    """
+    What every instance of an `EppDoc` class has in common, compiled once
+    when the class is created: the skeleton dict of new documents, the
+    `_childorder` and `_nsmap` of each level (for ``annotate``), the
+    compiled child order used by ``to_xml``, and the response normalizers
+    (merged along the MRO) used when parsing. The `_multi_nodes` are not
+    part of it: they are read when parsing, as for other `XmlDictObject`
+    classes, so that paths added later are honoured.
+    """
+    # pylint: disable=too-few-public-methods
+    __slots__ = ('skeleton', 'levels', 'childorder', 'nsmap', 'response_normalizers')
+
+    def __init__(self, cls):
+        # pylint: disable=w0212
+        self.levels = []
+        # we need to search mro because if we just did `cls._childorder` it could come from any
+        # superclass, which may not correspond to the same level where `cls._path` is defined.
+        # Also, we want to be able to have each level define its own
+        # childorder.
+        for aclass in cls.__mro__:
+            if not isinstance(aclass, EppDocMeta):
+                # a mixin, which may come before the documents in the mro
+                continue
+            if '_childorder' in aclass.__dict__ or '_nsmap' in aclass.__dict__:
+                self.levels.append((aclass._path, aclass.__dict__.get('_childorder'),
+                                    aclass.__dict__.get('_nsmap')))
+            if not any(isinstance(base, EppDocMeta) for base in aclass.__bases__):
+                # `EppDoc` itself: done searching
+                break
+        self.nsmap = getattr(cls, '_nsmap', EPP_NSMAP)
+        self.response_normalizers = {}
+        for aclass in reversed(cls.__mro__):
+            self.response_normalizers.update(aclass.__dict__.get('_response_normalizers', {}))
+
+        # build a dictionary containing the definition of the order that child elements
+        # should be serialized
+        # NOTE: this does not contain the root element
+        # ``cls._childorder`` is defined relative to cls._path, so we do some tree grafting here
+        qualified_childorder = dpath_make(cls._path[1:])
+        if cls._path[1:]:
+            dpath_get(qualified_childorder, cls._path[1:-1])[cls._path[-1]] = cls._childorder
+        else:
+            qualified_childorder = cls._childorder
+        self.childorder = ChildOrder(qualified_childorder)
+        self.skeleton = None  # set by `EppDocMeta` from ``cls._make_skeleton()``
+
+
+class EppDocMeta(type):
+    """
+    Compiles the `DocPlan` of each `EppDoc` class
+    """
+
+    def __init__(cls, name, bases, attrs):
+        super(EppDocMeta, cls).__init__(name, bases, attrs)
+        cls._plan = DocPlan(cls)
+        cls._plan.skeleton = cls._make_skeleton()
+
+
+@add_metaclass(EppDocMeta)
 class EppDoc(XmlDictObject):
+    # response element paths -> function applied to the value of each such
+    # element (see `xml2dict`), e.g. `text_node`
+    _response_normalizers = {}
 
     def __init__(self, dct=None, nsmap=None, extra_nsmap=None):
         # NOTE: setting attributes in __init__ will require special handling, see
         # XmlDictObject
         if not nsmap:
-            nsmap = getattr(self.__class__, '_nsmap', EPP_NSMAP).copy()
+            nsmap = self._plan.nsmap.copy()
         if not dct:
             dct = self.cmddef()
         super(EppDoc, self).__init__(dct, nsmap=nsmap, extra_nsmap=extra_nsmap)
 
-    def to_xml(self, force_prefix):
-        # build a dictionary containing the definition of the order that child elements
-        # should be serialized
-        # NOTE: this does not contain the root element
-        # ``self._childorder`` is defined relative to self._path, so we do some tree grafting here
-        qualified_childorder = dpath_make(self._path[1:])
-        if self._path[1:]:
-            dpath_get(qualified_childorder, self._path[
-                1:-1])[self._path[-1]] = self._childorder
-        else:
-            qualified_childorder = self._childorder
-        return super(EppDoc, self).to_xml(
-            qualified_childorder, force_prefix=force_prefix)
+    def to_xml(self, force_prefix, pretty=True):
+        return super(EppDoc, self).to_xml(self._plan.childorder, force_prefix=force_prefix,
+                                          pretty=pretty)
 
     def __unicode__(self):
         return self.to_xml(force_prefix=False)
@@ -66,29 +155,30 @@ class EppDoc(XmlDictObject):
         def __str__(self):
             return str(self.__unicode__(), 'utf-8')
 
-    # pylint: disable=w0212, e1101
+        def __bytes__(self):
+            return self.to_xml(force_prefix=False)
+
     @classmethod
     def cmddef(cls):
         """
-        Create an `XmlDictObject` based on the `_path` defined, and goes through each
-        super class to wire up the _childorder
+        Create a dict based on the `_path` defined, with the _childorder of
+        each level wired up (a copy of the skeleton compiled for the class)
         """
-        dct = dpath_make(cls._path)
-
-        # we need to search mro because if we just did `cls._childorder` it could come from any
-        # superclass, which may not correspond to the same level where `cls._path` is defined.
-        # Also, we want to be able to have each level define its own
-        # childorder.
-        for aclass in cls.__mro__:
-            if aclass == EppDoc:
-                # done searching
-                break
+        return _copy_skeleton(cls._plan.skeleton)
 
-            if '_childorder' in aclass.__dict__:
-                dpath_get(
-                    dct, aclass._path)['_order'] = aclass._childorder.get('__order', tuple())
-            if '_nsmap' in aclass.__dict__:
-                dpath_get(dct, aclass._path)['_nsmap'] = aclass._nsmap
+    # pylint: disable=w0212, e1101
+    @classmethod
+    def _make_skeleton(cls):
+        """
+        Build the skeleton returned by ``cmddef``. Called once, when the class
+        is created.
+        """
+        dct = dpath_make(cls._path)
+        for path, childorder_, nsmap in cls._plan.levels:
+            if childorder_ is not None:
+                dpath_get(dct, path)['_order'] = childorder_.get('__order', tuple())
+            if nsmap is not None:
+                dpath_get(dct, path)['_nsmap'] = nsmap
         return dct
 
     # pylint: disable=w0212, e1101
@@ -99,24 +189,12 @@ class EppDoc(XmlDictObject):
         and _nsmap fields
         """
         dct = dct or dpath_make(cls._path)
-
-        # we need to search mro because if we just did `cls._childorder` it could come from any
-        # superclass, which may not correspond to the same level where `cls._path` is defined.
-        # Also, we want to be able to have each level define its own
-        # childorder.
-        for aclass in cls.__mro__:
-            if aclass == EppDoc:
-                # done searching
-                break
-
-            if '_childorder' in aclass.__dict__:
+        for path, childorder_, nsmap in cls._plan.levels:
+            if childorder_ is not None:
                 # recursively annotate the dict items
-                cls._annotate_order_recurse(
-                    dpath_get(dct, aclass._path), aclass._childorder)
-                # dpath_get(dct, aclass._path)['_order'] = aclass._childorder['__order']
-
-            if '_nsmap' in aclass.__dict__:
-                dpath_get(dct, aclass._path)['_nsmap'] = aclass._nsmap
+                cls._annotate_order_recurse(dpath_get(dct, path), childorder_)
+            if nsmap is not None:
+                dpath_get(dct, path)['_nsmap'] = nsmap
         return dct
 
     def freeze(self):
@@ -138,14 +216,43 @@ class EppDoc(XmlDictObject):
                         cls._annotate_order_recurse(elem, childorder_[k])
 
     @classmethod
-    def from_xml(cls, buf, default_prefix='epp', extra_nsmap=None):
+    def from_xml(cls, buf, default_prefix='epp', extra_nsmap=None, **kwargs):
         return super(EppDoc, cls).from_xml(
-            buf, default_prefix=default_prefix, extra_nsmap=extra_nsmap)
+            buf, default_prefix=default_prefix, extra_nsmap=extra_nsmap, **kwargs)
+
+    @classmethod
+    def from_element(cls, root, default_prefix='epp', extra_nsmap=None,
+                     strip_hints=False, normalizers=None):
+        return xml2dict(root, outerclass=cls, default_prefix=default_prefix,
+                        multi_nodes=cls._multi_nodes, extra_nsmap=extra_nsmap,
+                        strip_hints=strip_hints, normalizers=normalizers)
 
     def normalize_response(self, respdoc):
         """
-        perform any cleanup of a response document resulting from this command
+        perform any cleanup of a response document resulting from this command:
+        apply the `_response_normalizers`, unless the response was parsed
+        with them (``EppClient.parse_response``), as normalizers are not
+        expected to be idempotent. Subclasses may override it for other
+        cleanups; see `run_normalize_hook`.
         """
+        normalizers = self._plan.response_normalizers
+        if not normalizers or respdoc.__dict__.get('_normalized'):
+            return
+        # parts of a lazy response get them when they are built
+        deferred = respdoc.__dict__.get('_deferred')
+        if deferred is not None:
+            deferred.set_normalizers(normalizers)
+        for path, normalize in iteritems(normalizers):
+            parent = respdoc
+            for key in path[:-1]:
+                parent = parent.get(key) if isinstance(parent, dict) else None
+            if not isinstance(parent, dict) or path[-1] not in parent:
+                continue
+            value = parent[path[-1]]
+            if isinstance(value, list):
+                value[:] = [normalize(item) for item in value]
+            else:
+                parent[path[-1]] = normalize(value)
 
 
 class EppHello(EppDoc):
@@ -156,16 +263,15 @@ class EppCommand(EppDoc):
     _path = ('epp', 'command')
     _childorder = {'__order': childorder.CMD_BASE}
 
-    def to_xml(self, force_prefix):
-        if hasattr(self, 'namestore_product') and self.namestore_product:
+    def to_xml(self, force_prefix, pretty=True):
+        node = self._path_node()
+        if node.get('namestore_product'):
             self['epp']['command'].setdefault(
                 'extension', {})['namestoreExt:namestoreExt'] = {
-                    'namestoreExt:subProduct': self.namestore_product}
-            del self.namestore_product
-        if hasattr(self, 'phases') and self.phases:
-            self.add_command_extension(self.phases)
-            del self.phases
-        return super(EppCommand, self).to_xml(force_prefix)
+                    'namestoreExt:subProduct': node.pop('namestore_product')}
+        if node.get('phases'):
+            self.add_command_extension(node.pop('phases'))
+        return super(EppCommand, self).to_xml(force_prefix, pretty=pretty)
 
     def add_command_extension(self, ext_dict):
         self['epp']['command'].setdefault(
@@ -176,6 +282,15 @@ class EppCommand(EppDoc):
     def add_clTRID(self, clTRID=None):
         self['epp']['command']['clTRID'] = clTRID or gen_trid()
 
+    def ensure_clTRID(self):
+        """
+        Return the clTRID of this command, generating one if none was set
+        """
+        cmd_node = self['epp']['command']
+        if not cmd_node.get('clTRID'):
+            cmd_node['clTRID'] = gen_trid()
+        return cmd_node['clTRID']
+
 
 class EppLoginCommand(EppCommand):
     _path = ('epp', 'command', 'login')
@@ -191,13 +306,13 @@ class EppLoginCommand(EppCommand):
                 dct=None,
                 nsmap=nsmap,
                 extra_nsmap=extra_nsmap)
-        dpath_get(self, self._path)
-        if not hasattr(self, 'options'):
+        node = dpath_get(self, self._path)
+        if 'options' not in node:
             self.options = {'version': '1.0', 'lang': 'en'}
         # pylint: disable=w0212
         self.options._order = ['version', 'lang']
 
-        if not hasattr(self, 'svcs'):
+        if 'svcs' not in node:
             extra_obj_uris = extra_obj_uris or []
             obj_uris = copy.copy(
                 obj_uris or list(
@@ -258,46 +373,18 @@ class EppInfoContactCommand(EppInfoCommand):
     _path = EppInfoCommand._path + ('contact:info',)
     _childorder = {'__order': childorder.CMD_INFO_CONTACT}
 
-    def normalize_response(self, respdoc):
-        """
-        clean up voice and fax
-        """
-        super(EppInfoContactCommand, self).normalize_response(respdoc)
-        try:
-            voice = respdoc.resData['contact:infData']['voice']
-        except (AttributeError, KeyError):
-            pass
-        else:
-            if not isinstance(voice, dict):
-                respdoc.resData['contact:infData']['voice'] = {'_text': voice}
-
-        try:
-            fax = respdoc.resData['contact:infData']['fax']
-        except (AttributeError, KeyError):
-            pass
-        else:
-            if not isinstance(fax, dict):
-                respdoc.resData['contact:infData']['fax'] = {'_text': fax}
+    _response_normalizers = {
+        RESDATA_PATH + ('contact:infData', 'voice'): text_node,
+        RESDATA_PATH + ('contact:infData', 'fax'): text_node,
+    }
 
 
 class EppInfoHostCommand(EppInfoCommand):
     _path = EppInfoCommand._path + ('host:info',)
 
-    def normalize_response(self, respdoc):
-        """
-        clean up addr
-        """
-        super(EppInfoHostCommand, self).normalize_response(respdoc)
-        try:
-            addrs = respdoc.resData['host:infData']['addr']
-        except (AttributeError, KeyError):
-            return
-
-        if addrs:
-            for i, addr in enumerate(addrs):
-                if not isinstance(addr, dict):
-                    # it should be a text
-                    addrs[i] = dict(_text=addr)
+    _response_normalizers = {
+        RESDATA_PATH + ('host:infData', 'addr'): text_node,
+    }
 
 
 class EppCreateCommand(EppCommand):
@@ -455,7 +542,7 @@ class EppTransferDomainCommand(EppTransferCommand):
     _childorder = {'__order': childorder.CMD_TRANSFER_DOMAON}
 
     @classmethod
-    def cmddef(cls):
+    def _make_skeleton(cls):
         dct = EppTransferCommand.cmddef()
         dpath = dpath_get(dct, EppTransferCommand._path)
         dpath['domain:transfer'] = {}
@@ -469,7 +556,7 @@ class EppTransferContactCommand(EppTransferCommand):
     _childorder = {'__order': childorder.CMD_TRANSFER_CONTACT}
 
     @classmethod
-    def cmddef(cls):
+    def _make_skeleton(cls):
         dct = EppTransferCommand.cmddef()
         dpath = dpath_get(dct, EppTransferCommand._path)
         dpath['contact:transfer'] = {}
@@ -521,11 +608,63 @@ class EppResponse(EppDoc):
         ('epp', 'response', 'extension', 'secDNS:infData', 'keyData'),
     ])
 
+    # children of <response> that ``from_xml(lazy=True)`` leaves unparsed
+    LAZY_CHILDREN = ('resData', 'extension')
+
     def __init__(self, dct=None, extra_nsmap=None):
         if dct is None:
             dct = {'epp': {'response': {}}}
         super(EppResponse, self).__init__(dct, extra_nsmap=extra_nsmap)
 
+    @classmethod
+    def from_element(cls, root, default_prefix='epp', extra_nsmap=None,
+                     strip_hints=False, normalizers=None, lazy=False):
+        """
+        With ``lazy``, only <result>, <msgQ> and <trID> are converted right
+        away. The `LAZY_CHILDREN` are kept as parsed elements and converted
+        the first time they are accessed as attributes (``resp.resData``,
+        ``get_response_extension``) or by ``materialize`` (also called by
+        ``unwrap`` and ``to_xml``).
+        """
+        if not lazy:
+            return super(EppResponse, cls).from_element(
+                root, default_prefix=default_prefix, extra_nsmap=extra_nsmap,
+                strip_hints=strip_hints, normalizers=normalizers)
+        deferred = Deferred(cls._path + (tag,) for tag in cls.LAZY_CHILDREN)
+        resp = xml2dict(root, outerclass=cls, default_prefix=default_prefix,
+                        multi_nodes=cls._multi_nodes, extra_nsmap=extra_nsmap,
+                        strip_hints=strip_hints, normalizers=normalizers, deferred=deferred)
+        if deferred.pending():
+            resp.__dict__['_deferred'] = deferred
+        return resp
+
+    def __getattr__(self, item):
+        deferred = self.__dict__.get('_deferred')
+        if deferred is not None:
+            deferred.build(item)
+        return super(EppResponse, self).__getattr__(item)
+
+    def materialize(self):
+        """
+        Convert what a lazy response left unparsed
+        """
+        deferred = self.__dict__.pop('_deferred', None)
+        if deferred is not None:
+            deferred.build()
+        return self
+
+    def unwrap(self):
+        return super(EppResponse, self.materialize()).unwrap()
+
+    def __getstate__(self):
+        # the elements of a lazy response (and their parser) cannot be
+        # pickled: convert them first
+        self.materialize()
+        return self.__dict__
+
+    def to_xml(self, force_prefix, pretty=True):
+        return super(EppResponse, self.materialize()).to_xml(force_prefix, pretty=pretty)
+
     @property
     def code(self):
         res = self.first_result
@@ -583,27 +722,55 @@ class EppResponse(EppDoc):
 
     @property
     def first_result(self):
-        if hasattr(self, 'result') and len(self.result):
-            return self.result[0]
+        results = self['epp']['response'].get('result')
+        if results:
+            return results[0]
         else:
             return None
 
+    @property
+    def cltrid(self):
+        trid = self['epp']['response'].get('trID')
+        return trid.get('clTRID') if isinstance(trid, dict) else None
+
+    @property
+    def svtrid(self):
+        trid = self['epp']['response'].get('trID')
+        return trid.get('svTRID') if isinstance(trid, dict) else None
+
     def get_response_extension(self, key, default=None):
         return getattr(self, 'extension', {}).get(key, default)
 
 
-def dpath_get(dct, path, default=None):
-    default = {} if default is None else default
-    cur = dct
-    for pat in path:
-        cur = cur.get(pat, default)
-    return cur
-
+def run_normalize_hook(doc, respdoc):
+    """
+    Call ``doc.normalize_response`` on a response already parsed with the
+    `_response_normalizers` of ``doc``, if its class overrides the method
+    (the normalizers themselves are not applied twice)
+    """
+    if type(doc).normalize_response is not EppDoc.normalize_response:
+        doc.normalize_response(respdoc)
+
+
+def ensure_cltrid(doc):
+    """
+    Return the clTRID the response to ``doc`` is to be matched by: that of a
+    command (generated if it has none) or `eppy.template.FilledCommand`,
+    ``None`` for other documents
+    """
+    ensure = getattr(type(doc), 'ensure_clTRID', None)
+    return ensure(doc) if ensure is not None else None
+
+
+def command_type(doc):
+    """
+    Return the EPP command of ``doc`` (e.g. ``'check'`` or ``'create'``),
+    ``'hello'`` for `EppHello` or ``None`` if it is not known
+    """
+    path = getattr(doc, '_path', ())
+    if len(path) > 2 and path[1] == 'command':
+        return path[2]
+    if path[1:] == ('hello',):
+        return 'hello'
+    return None
 
-def dpath_make(path):
-    out = {}
-    cur = out
-    for pat in path:
-        cur[pat] = {}
-        cur = cur[pat]
-    return out
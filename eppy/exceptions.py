@@ -23,3 +23,13 @@ class EppConnectionError(EppException):
 class EppLoginError(EppException):
     """EPP Loging Error. Extends EppException"""
     pass
+
+
+class EppUnknownOutcomeError(EppConnectionError):
+    """
+    The connection failed while a mutating command was in flight and it could
+    not be determined whether the server applied it. Extends EppConnectionError
+    """
+    def __init__(self, resp, doc=None):
+        self.doc = doc
+        super(EppUnknownOutcomeError, self).__init__(resp)
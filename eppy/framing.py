@@ -0,0 +1,188 @@
+"""
+Module that implements EPP (RFC 5734) framing over a stream socket
+"""
+
+import struct
+from collections import deque
+from itertools import islice
+
+
+HEADER = struct.Struct(">I")
+
+# most systems refuse more buffers in one sendmsg call
+IOV_MAX = 1024
+
+
+def send_buffers(sock, buffers):
+    """
+    Write all of ``buffers`` to ``sock`` with vectored ``sendmsg`` calls,
+    without concatenating them first
+    """
+    views = deque(memoryview(buf) for buf in buffers if len(buf))
+    while views:
+        sent = sock.sendmsg(list(islice(views, IOV_MAX)))
+        while sent:
+            head = views[0]
+            if sent < len(head):
+                views[0] = head[sent:]
+                break
+            sent -= len(head)
+            views.popleft()
+
+
+class FrameError(IOError):
+    """
+    The stream ended in the middle of a frame or carried an invalid frame.
+    The connection cannot be used any more.
+    """
+
+
+class FrameReader(object):
+    """
+    Reads length-prefixed frames from a socket into one reusable buffer.
+
+    Each ``recv_into`` call asks for as much as fits in the buffer, so a burst
+    of responses (e.g. after a pipelined ``batchsend``) is usually split into
+    frames without further syscalls. Frames are returned as ``memoryview``
+    slices of the buffer: they are only valid until the next ``read_frame()``.
+    """
+
+    def __init__(self, sock, bufsize=65536, max_frame_size=None):
+        """
+        :param bufsize: initial buffer size, grown as needed for larger frames
+        :param max_frame_size: largest frame (including the 4-byte header)
+                               accepted; ``None`` for no limit
+        """
+        self.sock = sock
+        self.max_frame_size = max_frame_size
+        self._buf = bytearray(bufsize)
+        self._view = memoryview(self._buf)
+        self._start = 0  # first byte not handed out yet
+        self._end = 0    # end of received data
+
+    @property
+    def buffered(self):
+        """number of received bytes not yet returned as frames"""
+        return self._end - self._start
+
+    def _make_room(self, need):
+        avail = self._end - self._start
+        if need > len(self._buf):
+            # a fresh buffer leaves frames handed out earlier untouched
+            buf = bytearray(max(need, 2 * len(self._buf)))
+            buf[:avail] = self._view[self._start:self._end]
+            self._buf = buf
+            self._view = memoryview(buf)
+        else:
+            self._view[:avail] = self._view[self._start:self._end]
+        self._start = 0
+        self._end = avail
+
+    def recv(self):
+        """
+        Receive whatever the socket has (blocking until at least one byte
+        arrives). Returns the number of bytes received, 0 on EOF.
+        """
+        if self._end == len(self._buf):
+            self._make_room(len(self._buf) - self._start + 1)
+        nbytes = self.sock.recv_into(self._view[self._end:])
+        self._end += nbytes
+        return nbytes
+
+    def _fill(self, need):
+        if self._start + need > len(self._buf):
+            self._make_room(need)
+        while self._end - self._start < need:
+            if not self.recv():
+                return False
+        return True
+
+    def _frame_size(self):
+        siz = HEADER.unpack_from(self._buf, self._start)[0]
+        if siz < 4:
+            raise FrameError("Invalid frame size %d" % siz)
+        if self.max_frame_size and siz > self.max_frame_size:
+            raise FrameError("Frame size %d exceeds limit of %d bytes" %
+                             (siz, self.max_frame_size))
+        return siz
+
+    def frame_size(self):
+        """
+        Payload size of the next frame, reading its header if needed
+        """
+        if not self._fill(4):
+            raise FrameError("No size header read")
+        return self._frame_size() - 4
+
+    def next_frame(self):
+        """
+        Return the next frame if it is already fully buffered, else ``None``.
+        Never touches the socket.
+        """
+        if self._end - self._start < 4:
+            return None
+        if self._end - self._start < self._frame_size():
+            return None
+        return self.read_frame()
+
+    def _skip(self, count):
+        """
+        Discard the next ``count`` bytes of the stream
+        """
+        while True:
+            chunk = min(self._end - self._start, count)
+            self._start += chunk
+            count -= chunk
+            if self._start == self._end:
+                self._start = self._end = 0
+            if not count:
+                return
+            if not self.recv():
+                raise FrameError("Short / no data read (%d bytes left to skip)" % count)
+
+    def feed_frame(self, feed):
+        """
+        Read a frame, passing its payload to ``feed`` piece by piece (as
+        ``memoryview`` slices) as soon as each piece has been received.
+        Returns the payload size.
+
+        If ``feed`` raises, the rest of the frame is read and discarded
+        before the exception is re-raised, so that the next read starts at
+        the next frame.
+        """
+        siz = remaining = self.frame_size()
+        self._start += 4
+        while True:
+            chunk = min(self._end - self._start, remaining)
+            if chunk:
+                try:
+                    feed(self._view[self._start:self._start + chunk])
+                except Exception:
+                    self._skip(remaining)
+                    raise
+                self._start += chunk
+                remaining -= chunk
+            if self._start == self._end:
+                self._start = self._end = 0
+            if not remaining:
+                return siz
+            if not self.recv():
+                raise FrameError(
+                    "Short / no data read (expected %d bytes, got %d)" %
+                    (siz, siz - remaining))
+
+    def read_frame(self):
+        """
+        Read a frame and return its payload as a ``memoryview``
+        """
+        siz = self.frame_size()
+        if not self._fill(4 + siz):
+            raise FrameError(
+                "Short / no data read (expected %d bytes, got %d)" %
+                (siz, self._end - self._start - 4))
+        start = self._start + 4
+        self._start = end = start + siz
+        if end == self._end:
+            # everything consumed: next recv can start at the beginning again
+            self._start = self._end = 0
+        return self._view[start:end]
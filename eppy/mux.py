@@ -0,0 +1,316 @@
+"""
+Module that implements the EppMultiplexer class, driving many EPP sessions
+from a single thread
+"""
+
+import logging
+import selectors
+import socket
+import ssl
+import threading
+from collections import deque, OrderedDict
+from concurrent.futures import Future
+
+from .client import EppClient
+from .doc import CLTRID_XPATH, ensure_cltrid, run_normalize_hook
+from .framing import HEADER, FrameError
+from .status import scan_cltrid
+from . import xmlbackend
+
+
+class _Endpoint(object):
+    """
+    State of one session owned by the multiplexer
+    """
+    # pylint: disable=too-few-public-methods
+
+    def __init__(self, name, client):
+        self.name = name
+        self.client = client
+        self.sock = client.sock
+        self.reader = client.frame_reader
+        self.outbuf = bytearray()
+        # clTRID (or a placeholder) -> (future, doc, extra_nsmap), in send order
+        self.pending = OrderedDict()
+        self.events = selectors.EVENT_READ
+
+
+class EppMultiplexer(object):
+    """
+    Selector based engine owning the sockets of many logged-in `EppClient`
+    sessions. One thread does all the non-blocking framed reads and writes;
+    ``submit()`` can be called from any thread and returns a
+    `concurrent.futures.Future` resolved with the `EppResponse`.
+
+    Responses are matched to commands by clTRID, so several commands can be
+    in flight on each session. With a ``codec`` (`eppy.offload.ProcessCodec`)
+    the loop thread only moves bytes: commands are serialized and responses
+    parsed in worker processes.
+    """
+
+    def __init__(self, codec=None):
+        self.codec = codec
+        self.log = logging.getLogger(__name__)
+        self.selector = selectors.DefaultSelector()
+        self.endpoints = {}
+        self._submissions = deque()
+        self._wakeup_r, self._wakeup_w = socket.socketpair()
+        self._wakeup_r.setblocking(False)
+        self._wakeup_w.setblocking(False)
+        self.selector.register(self._wakeup_r, selectors.EVENT_READ, None)
+        self._thread = None
+        self._running = False
+
+    # pylint: disable=c0103
+    def add_endpoint(self, name, client, clID=None, pw=None, **login_kwargs):
+        """
+        Hand ``client`` over to the multiplexer under ``name``. It is
+        connected (and logged in, if ``clID`` is given) first if needed; this
+        part is blocking. The client must not be used directly afterwards.
+        """
+        if name in self.endpoints:
+            raise ValueError("endpoint %s already exists" % name)
+        if client.sock is None:
+            client.connect()
+            if clID is not None:
+                client.login(clID, pw, **login_kwargs)
+        client.sock.setblocking(False)
+        endpoint = _Endpoint(name, client)
+        self.endpoints[name] = endpoint
+        self._submissions.append((endpoint, None, None, None, None))
+        self._wakeup()
+        return endpoint
+    # pylint: enable=c0103
+
+    def add_endpoints(self, endpoints):
+        """
+        Add several ``(name, client, clID, pw)`` endpoints, connecting and
+        logging in to them in parallel threads
+        """
+        threads = [threading.Thread(target=self.add_endpoint, args=args)
+                   for args in endpoints]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def submit(self, doc, endpoint, extra_nsmap=None):
+        """
+        Queue ``doc`` for the session registered as ``endpoint`` and return a
+        future for its response. Serialization happens in the calling thread.
+        """
+        future = Future()
+        name, endpoint = endpoint, self.endpoints.get(endpoint)
+        if endpoint is None:
+            future.set_exception(IOError("no session for endpoint %s" % name))
+            return future
+        key = ensure_cltrid(doc)
+        if key is None:
+            key = object()
+        if self.codec is not None:
+            buf = self.codec.serialize(doc)
+        else:
+            buf = doc.to_xml(force_prefix=True)
+        self._submissions.append((endpoint, key, HEADER.pack(4 + len(buf)) + buf,
+                                  doc, (future, extra_nsmap)))
+        self._wakeup()
+        return future
+
+    def _wakeup(self):
+        try:
+            self._wakeup_w.send(b'\0')
+        except (BlockingIOError, InterruptedError):
+            # a wakeup is already pending
+            pass
+
+    def start(self):
+        """
+        Run the event loop in a background thread
+        """
+        self._running = True
+        self._thread = threading.Thread(target=self.run, name='EppMultiplexer')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def run(self):
+        """
+        Run the event loop in the current thread until ``stop()`` is called
+        """
+        self._running = True
+        while self._running:
+            for key, events in self.selector.select():
+                endpoint = key.data
+                if endpoint is None:
+                    self._drain_wakeup()
+                    continue
+                try:
+                    if events & selectors.EVENT_WRITE:
+                        self._write(endpoint)
+                    if events & selectors.EVENT_READ:
+                        self._read(endpoint)
+                except Exception as exp:  # pylint: disable=broad-except
+                    self._fail(endpoint, exp)
+
+    def stop(self):
+        self._running = False
+        self._wakeup()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+            self._thread = None
+
+    def close(self, logout=True):
+        """
+        Stop the event loop, then log out and close every session
+        """
+        self.stop()
+        for endpoint in list(self.endpoints.values()):
+            self._remove(endpoint, IOError("Multiplexer closed"))
+            client = endpoint.client
+            if client.sock is None:
+                continue
+            client.sock.settimeout(client.socket_timeout)
+            if logout:
+                try:
+                    client.logout()
+                except Exception:  # pylint: disable=broad-except
+                    pass
+            if client.sock is not None:
+                client.close()
+        self.selector.close()
+        self._wakeup_r.close()
+        self._wakeup_w.close()
+
+    def _drain_wakeup(self):
+        try:
+            while self._wakeup_r.recv(4096):
+                pass
+        except (BlockingIOError, InterruptedError):
+            pass
+        while self._submissions:
+            endpoint, key, frame, doc, extra = self._submissions.popleft()
+            if key is None:
+                # new endpoint
+                self.selector.register(endpoint.sock, endpoint.events, endpoint)
+                continue
+            if endpoint.name not in self.endpoints:
+                extra[0].set_exception(IOError("endpoint %s was removed" % endpoint.name))
+                continue
+            if key in endpoint.pending:
+                extra[0].set_exception(ValueError("clTRID %s is already in flight" % key))
+                continue
+            endpoint.pending[key] = (extra[0], doc, extra[1])
+            endpoint.outbuf += frame
+            try:
+                self._write(endpoint)
+            except (IOError, OSError) as exp:
+                self._fail(endpoint, exp)
+
+    def _set_events(self, endpoint, events):
+        if events != endpoint.events:
+            endpoint.events = events
+            self.selector.modify(endpoint.sock, events, endpoint)
+
+    def _write(self, endpoint):
+        outbuf = endpoint.outbuf
+        try:
+            while outbuf:
+                del outbuf[:endpoint.sock.send(outbuf)]
+        except (BlockingIOError, InterruptedError, ssl.SSLWantWriteError, ssl.SSLWantReadError):
+            pass
+        self._set_events(endpoint, selectors.EVENT_READ |
+                         (selectors.EVENT_WRITE if outbuf else 0))
+
+    def _read(self, endpoint):
+        reader = endpoint.reader
+        while True:
+            try:
+                if not reader.recv():
+                    raise FrameError("Connection closed by %s" % endpoint.name)
+            except (BlockingIOError, InterruptedError, ssl.SSLWantReadError, ssl.SSLWantWriteError):
+                break
+            frame = reader.next_frame()
+            while frame is not None:
+                if self.codec is not None:
+                    self._dispatch_offloaded(endpoint, frame)
+                else:
+                    self._dispatch_frame(endpoint, frame)
+                frame = reader.next_frame()
+            # data already decrypted by the SSL layer does not wake up the selector
+            if not getattr(endpoint.sock, 'pending', lambda: 0)():
+                break
+
+    def _pop_pending(self, endpoint, cltrid):
+        entry = endpoint.pending.pop(cltrid, None)
+        if entry is None:
+            if not endpoint.pending:
+                self.log.warning("discarding unsolicited response from %s", endpoint.name)
+                return None
+            # no (known) clTRID: servers answer in order
+            _, entry = endpoint.pending.popitem(last=False)
+        if not entry[0].set_running_or_notify_cancel():
+            return None
+        return entry
+
+    def _dispatch_offloaded(self, endpoint, frame):
+        entry = self._pop_pending(endpoint, scan_cltrid(frame))
+        if entry is None:
+            return
+        future, doc, extra_nsmap = entry
+
+        def done(parsed):
+            try:
+                resp = parsed.result()
+                doc.normalize_response(resp)
+            except Exception as exp:  # pylint: disable=broad-except
+                future.set_exception(exp)
+            else:
+                future.set_result(resp)
+        self.codec.submit_parse(frame, extra_nsmap=extra_nsmap).add_done_callback(done)
+
+    def _dispatch_frame(self, endpoint, frame):
+        """
+        Parse ``frame`` and dispatch it. A frame that cannot be parsed only
+        fails the command it answers: the framing is intact, so the session
+        goes on.
+        """
+        try:
+            root = xmlbackend.fromstring(frame)
+        except Exception as exp:  # pylint: disable=broad-except
+            self.log.error("unparsable response from %s: %s", endpoint.name, exp)
+            entry = self._pop_pending(endpoint, scan_cltrid(frame))
+            if entry is not None:
+                entry[0].set_exception(exp)
+            return
+        self._dispatch(endpoint, root)
+
+    def _dispatch(self, endpoint, root):
+        entry = self._pop_pending(endpoint, root.findtext(CLTRID_XPATH))
+        if entry is None:
+            return
+        future, doc, extra_nsmap = entry
+        try:
+            resp = EppClient.parse_response(root, doc, extra_nsmap)
+            run_normalize_hook(doc, resp)
+        except Exception as exp:  # pylint: disable=broad-except
+            future.set_exception(exp)
+        else:
+            future.set_result(resp)
+
+    def _remove(self, endpoint, exp):
+        if self.endpoints.pop(endpoint.name, None) is None:
+            return
+        try:
+            self.selector.unregister(endpoint.sock)
+        except (KeyError, ValueError):
+            pass
+        pending, endpoint.pending = endpoint.pending, OrderedDict()
+        for future, _, _ in pending.values():
+            if future.set_running_or_notify_cancel():
+                future.set_exception(exp)
+
+    def _fail(self, endpoint, exp):
+        self.log.error("session %s failed with %d command(s) in flight: %s",
+                       endpoint.name, len(endpoint.pending), exp)
+        self._remove(endpoint, exp)
+        if endpoint.client.sock is not None:
+            endpoint.client.close()
@@ -0,0 +1,58 @@
+"""
+Module that implements offloading of XML parsing and serialization to a
+pool of worker processes
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+
+from .doc import EppDoc, EppResponse
+
+
+def _parse(buf, extra_nsmap, strip_hints):
+    # sent back as is: all the nodes share the nsmap of the response, which
+    # is pickled once, and the caller has nothing to rebuild
+    return EppResponse.from_xml(buf, extra_nsmap=extra_nsmap, strip_hints=strip_hints)
+
+
+def _serialize(cls, dct, nsmap, force_prefix, pretty):
+    doc = cls.__new__(cls)
+    # pylint: disable=non-parent-init-called
+    EppDoc.__init__(doc, dct, nsmap=nsmap)
+    return doc.to_xml(force_prefix=force_prefix, pretty=pretty)
+
+
+class ProcessCodec(object):
+    """
+    Runs `EppResponse.from_xml` (plus ``strip_hints``) and `EppDoc.to_xml`
+    in worker processes, so that many sessions in one process are not
+    limited to one core by the GIL. Raw frame bytes, plain dicts and parsed
+    responses cross the process boundary; socket I/O stays with the caller.
+
+    Pass it as ``codec`` to `EppClient` (each thread blocks on its own
+    session while others keep running) or to `eppy.mux.EppMultiplexer`.
+    """
+
+    def __init__(self, max_workers=None, executor=None):
+        self.executor = executor or ProcessPoolExecutor(max_workers=max_workers)
+
+    def submit_parse(self, buf, extra_nsmap=None, strip_hints=True):
+        """
+        Start parsing ``buf`` and return a future of the `EppResponse`
+        """
+        if isinstance(buf, memoryview):
+            buf = buf.tobytes()
+        return self.executor.submit(_parse, buf, extra_nsmap, strip_hints)
+
+    def parse(self, buf, extra_nsmap=None, strip_hints=True):
+        return self.submit_parse(buf, extra_nsmap, strip_hints).result()
+
+    def submit_serialize(self, doc, force_prefix=True, pretty=True):
+        # pylint: disable=w0212
+        return self.executor.submit(_serialize, doc.__class__, doc.unwrap(), doc._nsmap,
+                                    force_prefix, pretty)
+
+    def serialize(self, doc, force_prefix=True, pretty=True):
+        return self.submit_serialize(doc, force_prefix, pretty).result()
+
+    def shutdown(self, wait=True):
+        self.executor.shutdown(wait=wait)
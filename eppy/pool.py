@@ -0,0 +1,214 @@
+"""
+Module that implements the EppClientPool class
+"""
+
+import logging
+import threading
+from contextlib import contextmanager
+
+from .client import EppClient
+from .exceptions import EppConnectionError
+from .utils import monotonic
+
+
+class EppClientPool(object):
+    """
+    Pool of connected and logged-in `EppClient` sessions for one (host, clID).
+
+    Sessions are handed out with ``session()`` and returned to the pool when
+    the ``with`` block exits. A session whose socket broke while checked out
+    is evicted instead of being returned. At most ``max_sessions`` sessions
+    are ever open at once (registries usually enforce a per-account limit),
+    callers wait for a free session beyond that.
+    """
+    # pylint: disable=too-many-instance-attributes
+    # pylint: disable=too-many-arguments
+
+    # pylint: disable=c0103
+    def __init__(self, host, clID, pw, port=700, size=1, max_sessions=None,
+                 max_idle=None, login_kwargs=None, client_factory=EppClient,
+                 **client_kwargs):
+        """
+        :param size: number of sessions opened by ``prewarm()`` (at most
+                     ``max_sessions``)
+        :param max_sessions: hard limit on open sessions (defaults to ``size``)
+        :param max_idle: seconds after which an idle session is checked with
+                         a <hello> before being handed out
+        :param login_kwargs: extra keyword arguments for ``EppClient.login``
+        :param client_kwargs: keyword arguments for the client constructor
+        """
+        self.host = host
+        self.port = port
+        self.clID = clID
+        self.pw = pw
+        self.max_sessions = max_sessions or size
+        self.size = min(size, self.max_sessions)
+        self.max_idle = max_idle
+        self.login_kwargs = login_kwargs or {}
+        self.client_factory = client_factory
+        self.client_kwargs = client_kwargs
+        self.log = logging.getLogger(__name__)
+        self._cond = threading.Condition()
+        self._idle = []  # stack of (client, last used)
+        self._num_sessions = 0
+    # pylint: enable=c0103
+
+    @property
+    def key(self):
+        return (self.host, self.clID)
+
+    @property
+    def num_sessions(self):
+        return self._num_sessions
+
+    @property
+    def num_idle(self):
+        return len(self._idle)
+
+    def _new_client(self):
+        client = self.client_factory(host=self.host, port=self.port, **self.client_kwargs)
+        try:
+            client.connect(self.host, self.port)
+            client.login(self.clID, self.pw, **self.login_kwargs)
+        except Exception:
+            self._discard(client)
+            raise
+        return client
+
+    @staticmethod
+    def _discard(client):
+        if client.sock is not None:
+            try:
+                client.close()
+            except (IOError, OSError):
+                pass
+
+    def prewarm(self, num=None):
+        """
+        Open sessions in parallel until ``num`` (defaults to ``size``) are
+        available. Returns the number of sessions opened.
+        """
+        num = self.size if num is None else num
+        with self._cond:
+            num = min(num, self.max_sessions) - self._num_sessions
+            if num <= 0:
+                return 0
+            self._num_sessions += num
+
+        opened = []
+
+        def warm():
+            try:
+                client = self._new_client()
+            except Exception:  # pylint: disable=broad-except
+                self.log.exception("failed to open session to %s as %s", *self.key)
+                self._evicted()
+            else:
+                opened.append(client)
+                self._checkin(client)
+
+        threads = [threading.Thread(target=warm) for _ in range(num)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return len(opened)
+
+    def _evicted(self):
+        with self._cond:
+            self._num_sessions -= 1
+            self._cond.notify()
+
+    def _checkin(self, client):
+        with self._cond:
+            self._idle.append((client, monotonic()))
+            self._cond.notify()
+
+    def _healthy(self, client, last_used):
+        if client.sock is None:
+            return False
+        if self.max_idle is not None and monotonic() - last_used > self.max_idle:
+            try:
+                client.hello()
+            except Exception:  # pylint: disable=broad-except
+                self.log.warning("idle session to %s as %s failed <hello>", *self.key)
+                return False
+        return True
+
+    def checkout(self, timeout=None):
+        """
+        Take a session out of the pool, opening a new one if none is idle and
+        the session limit allows. Waits up to ``timeout`` seconds otherwise.
+        """
+        deadline = None if timeout is None else monotonic() + timeout
+        while True:
+            with self._cond:
+                while not self._idle and self._num_sessions >= self.max_sessions:
+                    remaining = None if deadline is None else deadline - monotonic()
+                    if remaining is not None and remaining <= 0:
+                        raise EppConnectionError(
+                            "timed out waiting for a session to %s as %s" % self.key)
+                    self._cond.wait(remaining)
+                if self._idle:
+                    client, last_used = self._idle.pop()
+                else:
+                    client = None
+                    self._num_sessions += 1
+
+            if client is None:
+                try:
+                    return self._new_client()
+                except Exception:
+                    self._evicted()
+                    raise
+            if self._healthy(client, last_used):
+                return client
+            self.evict(client)
+
+    def checkin(self, client):
+        """
+        Return a session to the pool. Sessions with a closed socket are evicted.
+        """
+        if client.sock is None:
+            self.evict(client)
+        else:
+            self._checkin(client)
+
+    def evict(self, client):
+        """
+        Drop a session from the pool
+        """
+        self._discard(client)
+        self._evicted()
+
+    @contextmanager
+    def session(self, timeout=None):
+        """
+        Context manager handing out a logged-in session. The session is
+        evicted if the block raises a socket error.
+        """
+        client = self.checkout(timeout)
+        broken = False
+        try:
+            yield client
+        except (IOError, OSError):
+            broken = True
+            raise
+        finally:
+            if broken:
+                self.evict(client)
+            else:
+                self.checkin(client)
+
+    def close(self):
+        """
+        Log out and close all idle sessions
+        """
+        with self._cond:
+            idle, self._idle = self._idle, []
+        for client, _ in idle:
+            try:
+                client.logout()
+            except Exception:  # pylint: disable=broad-except
+                pass
+            self.evict(client)
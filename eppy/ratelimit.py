@@ -0,0 +1,186 @@
+"""
+Module that implements client-side rate limiting of EPP commands
+"""
+
+import threading
+import time
+
+from .doc import command_type
+from .utils import monotonic
+
+
+class TokenBucket(object):
+    """
+    Token bucket allowing ``rate`` operations per second on average and
+    bursts of up to ``burst`` operations. Thread-safe, so a bucket can be
+    shared by several sessions (e.g. for a per-account quota).
+    """
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.capacity = float(burst or max(rate, 1))
+        self.tokens = self.capacity
+        self.updated = monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, num=1):
+        """
+        Take ``num`` tokens and return how many seconds the caller has to wait
+        before using them. Tokens may be borrowed from the future, so callers
+        are served in the order they made their reservation.
+        """
+        with self._lock:
+            now = monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= num
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+
+class RateLimiter(object):
+    """
+    Token buckets per command type (as returned by `eppy.doc.command_type`,
+    e.g. ``'check'`` or ``'create'``).
+
+    ``limits`` maps a command type to a rate per second, a ``(rate, burst)``
+    tuple or a `TokenBucket`. Command types without a limit use ``default``
+    if given and are not limited otherwise.
+    """
+
+    def __init__(self, limits=None, default=None):
+        self.buckets = dict((cmdtype, self._bucket(limit))
+                            for cmdtype, limit in (limits or {}).items())
+        self.default = self._bucket(default) if default else None
+
+    @staticmethod
+    def _bucket(limit):
+        if isinstance(limit, TokenBucket):
+            return limit
+        if isinstance(limit, tuple):
+            return TokenBucket(*limit)
+        return TokenBucket(limit)
+
+    def reserve(self, cmdtype, num=1):
+        bucket = self.buckets.get(cmdtype, self.default)
+        if bucket is None:
+            return 0.0
+        return bucket.reserve(num)
+
+
+class TimingStats(object):
+    """
+    Accumulated time spent waiting for the rate limiter and on the network
+    """
+    __slots__ = ('count', 'queue_wait', 'network')
+
+    def __init__(self):
+        self.count = 0
+        self.queue_wait = 0.0
+        self.network = 0.0
+
+    def add(self, count, queue_wait, network):
+        self.count += count
+        self.queue_wait += queue_wait
+        self.network += network
+
+    def __repr__(self):
+        return '<TimingStats count=%d queue_wait=%.3fs network=%.3fs>' % (
+            self.count, self.queue_wait, self.network)
+
+
+class RateLimitedClient(object):
+    """
+    Wraps an `EppClient` (one session) so that ``send`` and ``batchsend`` wait
+    until the command type and the session have enough tokens, instead of
+    going over the registry quota.
+
+    Pass the same ``limiter`` to the clients of all sessions of an account to
+    enforce per-account limits; ``session_rate`` (commands per second, or a
+    ``(rate, burst)`` tuple) limits this session only.
+
+    Time spent waiting for tokens and time spent in the client are accumulated
+    separately per command type in ``stats``, and passed to ``on_timing`` as
+    ``on_timing(cmdtype, count, queue_wait, network)`` if given.
+    """
+
+    def __init__(self, client, limiter=None, limits=None, session_rate=None, on_timing=None):
+        self.client = client
+        self.limiter = limiter or RateLimiter(limits)
+        self.session_bucket = RateLimiter._bucket(session_rate) if session_rate else None
+        self.on_timing = on_timing
+        self.stats = {}
+
+    def __getattr__(self, item):
+        # everything else (login, logout, hello, close...) goes straight to the client
+        return getattr(self.client, item)
+
+    def _reserve(self, doc):
+        delay = self.limiter.reserve(command_type(doc))
+        if self.session_bucket is not None:
+            delay = max(delay, self.session_bucket.reserve())
+        return delay
+
+    @staticmethod
+    def _wait(delay):
+        if delay <= 0:
+            return 0.0
+        start = monotonic()
+        time.sleep(delay)
+        return monotonic() - start
+
+    def _record(self, cmdtype, count, queue_wait, network):
+        stats = self.stats.get(cmdtype)
+        if stats is None:
+            stats = self.stats[cmdtype] = TimingStats()
+        stats.add(count, queue_wait, network)
+        if self.on_timing is not None:
+            self.on_timing(cmdtype, count, queue_wait, network)
+
+    def send(self, doc, *args, **kwargs):
+        queue_wait = self._wait(self._reserve(doc))
+        start = monotonic()
+        try:
+            return self.client.send(doc, *args, **kwargs)
+        finally:
+            self._record(command_type(doc), 1, queue_wait, monotonic() - start)
+
+    def batchsend(self, docs, *args, **kwargs):
+        """
+        Sends the batch with ``EppClient.batchsend`` at the allowed pace:
+        tokens are reserved for every command up front (so the batch keeps
+        its place in the buckets), then each command goes out when its
+        tokens are due, together with the others due by then. Returns the
+        concatenated results (or total count, without ``readresponse``).
+        """
+        docs = list(docs)
+        if not docs:
+            return self.client.batchsend(docs, *args, **kwargs)
+        origin = monotonic()
+        due = [origin + self._reserve(doc) for doc in docs]
+        queue_wait = network = 0.0
+        out = None
+        pos = 0
+        try:
+            while pos < len(docs):
+                queue_wait += self._wait(due[pos] - monotonic())
+                now = monotonic()
+                end = pos + 1
+                while end < len(docs) and due[end] <= now:
+                    end += 1
+                start = monotonic()
+                try:
+                    result = self.client.batchsend(docs[pos:end], *args, **kwargs)
+                finally:
+                    network += monotonic() - start
+                if out is None:
+                    out = result
+                else:
+                    out += result
+                pos = end
+            return out
+        finally:
+            cmdtypes = set(command_type(doc) for doc in docs)
+            self._record(cmdtypes.pop() if len(cmdtypes) == 1 else None,
+                         len(docs), queue_wait, network)
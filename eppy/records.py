@@ -0,0 +1,248 @@
+"""
+Module that implements typed records (check, create and info results)
+decoded straight from the element tree of responses, for callers that keep
+many results around: ``__slots__`` records are much smaller and faster to
+read than the nested dicts of an `EppResponse`
+"""
+
+from .doc import EPP_NSMAP
+from .status import StatusResponse
+from . import xmlbackend
+
+
+EPP = '{%s}' % EPP_NSMAP['epp']
+DOMAIN = '{%s}' % EPP_NSMAP['domain']
+HOST = '{%s}' % EPP_NSMAP['host']
+CONTACT = '{%s}' % EPP_NSMAP['contact']
+
+
+def _text(elem, tag):
+    text = elem.findtext(tag)
+    return text.strip() if text is not None else None
+
+
+def _statuses(elem, ns):
+    return tuple(status.get('s') for status in elem.findall(ns + 'status'))
+
+
+class Record(object):
+    """
+    Base of the records: fields are set by keyword, the others are None
+    """
+    __slots__ = ()
+
+    def __init__(self, **fields):
+        for field in self.__slots__:
+            setattr(self, field, fields.pop(field, None))
+        if fields:
+            raise TypeError("unknown fields for %s: %s" % (type(self).__name__,
+                                                          ', '.join(sorted(fields))))
+
+    def as_dict(self):
+        return dict((field, getattr(self, field)) for field in self.__slots__)
+
+    def __eq__(self, other):
+        return type(self) is type(other) and all(
+            getattr(self, field) == getattr(other, field) for field in self.__slots__)
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return '<%s %s>' % (type(self).__name__, ' '.join(
+            '%s=%r' % (field, getattr(self, field)) for field in self.__slots__
+            if getattr(self, field) is not None))
+
+
+class CheckResult(Record):
+    """
+    One <cd> of a check: ``name`` is the contact id for contacts
+    """
+    __slots__ = ('name', 'avail', 'reason')
+
+
+class CreateResult(Record):
+    """
+    <creData>: ``name`` is the contact id for contacts, which have no
+    ``exDate``
+    """
+    __slots__ = ('name', 'crDate', 'exDate')
+
+
+class DomainInfo(Record):
+    """
+    <domain:infData>. ``contacts`` holds (type, id) pairs and ``ns`` the
+    host names, whether given as <hostObj> or <hostAttr>.
+    """
+    # pylint: disable=c0103
+    __slots__ = ('name', 'roid', 'status', 'registrant', 'contacts', 'ns', 'hosts', 'clID',
+                 'crID', 'crDate', 'upID', 'upDate', 'exDate', 'trDate', 'authInfo')
+
+
+class HostInfo(Record):
+    """
+    <host:infData>. ``addrs`` holds (``'v4'`` or ``'v6'``, address) pairs.
+    """
+    __slots__ = ('name', 'roid', 'status', 'addrs', 'clID', 'crID', 'crDate', 'upID',
+                 'upDate', 'trDate')
+
+
+class ContactInfo(Record):
+    """
+    <contact:infData>. The postal fields come from the ``int`` <postalInfo>
+    if there is one, the first one otherwise, ``street`` being a tuple.
+    """
+    __slots__ = ('id', 'roid', 'status', 'postal_type', 'name', 'org', 'street', 'city', 'sp',
+                 'pc', 'cc', 'voice', 'fax', 'email', 'clID', 'crID', 'crDate', 'upID',
+                 'upDate', 'trDate')
+
+
+def _check_decoder(ns, key):
+    def decode(elem):
+        out = []
+        for cd in elem.findall(ns + 'cd'):
+            name = cd.find(ns + key)
+            out.append(CheckResult(
+                name=name.text.strip() if name is not None and name.text else None,
+                avail=name is not None and name.get('avail') in ('1', 'true'),
+                reason=_text(cd, ns + 'reason')))
+        return out
+    return decode
+
+
+def _create_decoder(ns, key):
+    def decode(elem):
+        return CreateResult(name=_text(elem, ns + key), crDate=_text(elem, ns + 'crDate'),
+                            exDate=_text(elem, ns + 'exDate'))
+    return decode
+
+
+def _common(elem, ns):
+    # fields shared by the <infData> of all objects
+    return dict((field, _text(elem, ns + field))
+                for field in ('roid', 'clID', 'crID', 'crDate', 'upID', 'upDate', 'trDate'))
+
+
+def decode_domain_info(elem):
+    ns = []
+    ns_elem = elem.find(DOMAIN + 'ns')
+    if ns_elem is not None:
+        for host in ns_elem:
+            if host.tag == DOMAIN + 'hostObj':
+                ns.append((host.text or '').strip())
+            elif host.tag == DOMAIN + 'hostAttr':
+                ns.append(_text(host, DOMAIN + 'hostName'))
+    return DomainInfo(
+        name=_text(elem, DOMAIN + 'name'),
+        status=_statuses(elem, DOMAIN),
+        registrant=_text(elem, DOMAIN + 'registrant'),
+        contacts=tuple((contact.get('type'), (contact.text or '').strip())
+                       for contact in elem.findall(DOMAIN + 'contact')),
+        ns=tuple(ns),
+        hosts=tuple((host.text or '').strip() for host in elem.findall(DOMAIN + 'host')),
+        exDate=_text(elem, DOMAIN + 'exDate'),
+        authInfo=_text(elem, DOMAIN + 'authInfo/' + DOMAIN + 'pw'),
+        **_common(elem, DOMAIN))
+
+
+def decode_host_info(elem):
+    return HostInfo(
+        name=_text(elem, HOST + 'name'),
+        status=_statuses(elem, HOST),
+        addrs=tuple((addr.get('ip', 'v4'), (addr.text or '').strip())
+                    for addr in elem.findall(HOST + 'addr')),
+        **_common(elem, HOST))
+
+
+def decode_contact_info(elem):
+    postal = None
+    for postal_info in elem.findall(CONTACT + 'postalInfo'):
+        if postal is None or postal_info.get('type') == 'int':
+            postal = postal_info
+    fields = {}
+    if postal is not None:
+        addr = postal.find(CONTACT + 'addr')
+        fields = dict(
+            postal_type=postal.get('type'),
+            name=_text(postal, CONTACT + 'name'),
+            org=_text(postal, CONTACT + 'org'))
+        if addr is not None:
+            fields.update(
+                street=tuple(street.text.strip() for street in addr.findall(CONTACT + 'street')
+                             if street.text),
+                city=_text(addr, CONTACT + 'city'),
+                sp=_text(addr, CONTACT + 'sp'),
+                pc=_text(addr, CONTACT + 'pc'),
+                cc=_text(addr, CONTACT + 'cc'))
+    fields.update(_common(elem, CONTACT))
+    return ContactInfo(
+        id=_text(elem, CONTACT + 'id'),
+        status=_statuses(elem, CONTACT),
+        voice=_text(elem, CONTACT + 'voice'),
+        fax=_text(elem, CONTACT + 'fax'),
+        email=_text(elem, CONTACT + 'email'),
+        **fields)
+
+
+# tag of the <resData> child -> function returning its record(s)
+DECODERS = {
+    DOMAIN + 'chkData': _check_decoder(DOMAIN, 'name'),
+    HOST + 'chkData': _check_decoder(HOST, 'name'),
+    CONTACT + 'chkData': _check_decoder(CONTACT, 'id'),
+    DOMAIN + 'creData': _create_decoder(DOMAIN, 'name'),
+    HOST + 'creData': _create_decoder(HOST, 'name'),
+    CONTACT + 'creData': _create_decoder(CONTACT, 'id'),
+    DOMAIN + 'infData': decode_domain_info,
+    HOST + 'infData': decode_host_info,
+    CONTACT + 'infData': decode_contact_info,
+}
+
+
+class RecordResponse(StatusResponse):
+    """
+    `StatusResponse` plus the ``msg`` of the first result and the
+    ``records`` decoded from <resData>: a list of `CheckResult` for checks,
+    a single record otherwise, ``None`` if no decoder applies
+    """
+    __slots__ = ('msg', 'records')
+
+    # pylint: disable=too-many-arguments
+    def __init__(self, code, cltrid=None, svtrid=None, msg=None, records=None):
+        super(RecordResponse, self).__init__(code, cltrid, svtrid)
+        self.msg = msg
+        self.records = records
+
+    def __repr__(self):
+        return '<RecordResponse %s clTRID=%s svTRID=%s records=%r>' % (
+            self.code, self.cltrid, self.svtrid, self.records)
+
+
+def decode_response(root, decoders=None):
+    """
+    Return the `RecordResponse` of a response frame or parsed <epp>
+    element. ``decoders`` defaults to `DECODERS`.
+    """
+    if isinstance(root, (bytes, bytearray, memoryview)):
+        root = xmlbackend.fromstring(root)
+    response = root.find(EPP + 'response')
+    if response is None:
+        raise ValueError("not an EPP response")
+    result = response.find(EPP + 'result')
+    records = None
+    res_data = response.find(EPP + 'resData')
+    if res_data is not None:
+        decoders = DECODERS if decoders is None else decoders
+        for elem in res_data:
+            decoder = decoders.get(elem.tag)
+            if decoder is not None:
+                records = decoder(elem)
+                break
+    trid = response.find(EPP + 'trID')
+    return RecordResponse(
+        result.get('code') if result is not None else '0000',
+        _text(trid, EPP + 'clTRID') if trid is not None else None,
+        _text(trid, EPP + 'svTRID') if trid is not None else None,
+        _text(result, EPP + 'msg') if result is not None else None,
+        records)
@@ -0,0 +1,296 @@
+"""
+Module that implements the ResilientEppClient class, which transparently
+reconnects and decides whether interrupted commands can be replayed
+"""
+
+import re
+import time
+from datetime import datetime, timedelta
+
+from .client import EppClient
+from .doc import (EppResponse, EppHello, EppLoginCommand, EppLogoutCommand,
+                  EppCheckCommand, EppCheckHostCommand, EppInfoCommand, EppPollCommand,
+                  EppCreateDomainCommand, EppCreateHostCommand, EppCreateContactCommand,
+                  EppDeleteDomainCommand, EppDeleteHostCommand, EppDeleteContactCommand,
+                  EppRenewDomainCommand, EppTransferCommand, EppTransferDomainCommand,
+                  EppInfoDomainCommand, EppInfoHostCommand, EppInfoContactCommand,
+                  dpath_get)
+from .exceptions import EppUnknownOutcomeError
+
+
+_EPP_DATE = re.compile(r'(\d{4})-(\d\d)-(\d\d)T(\d\d):(\d\d):(\d\d)(?:\.\d+)?'
+                       r'(Z|[+-]\d\d:\d\d)?$')
+
+
+def _parse_date(value):
+    """
+    Parse an EPP dateTime (e.g. ``2020-01-01T00:00:00.0Z``) into a naive
+    UTC datetime, to the second. Returns None if it cannot be parsed.
+    """
+    match = _EPP_DATE.match(str(value or '').strip())
+    if not match:
+        return None
+    date = datetime(*[int(part) for part in match.groups()[:6]])
+    tz = match.group(7)
+    if tz and tz != 'Z':
+        offset = timedelta(hours=int(tz[1:3]), minutes=int(tz[4:6]))
+        date = date - offset if tz[0] == '+' else date + offset
+    return date
+
+
+def _utcnow():
+    # naive UTC, as utcnow() is deprecated on recent Pythons
+    return datetime(1970, 1, 1) + timedelta(seconds=time.time())
+
+
+# pylint: disable=w0212
+
+def _object_info(client, doc, info_class, key='name'):
+    """
+    Run an <info> for the object targeted by ``doc``. Returns the response
+    and the infData node (``None`` if the object does not exist).
+    """
+    ident = dpath_get(doc, doc._path).get(key)
+    if not ident:
+        return None, None
+    info = info_class()
+    setattr(info, key, ident)
+    resp = EppClient.send(client, info, log_send_recv=False)
+    if resp.code == '2303':
+        # object does not exist
+        return resp, None
+    if not resp.ok:
+        return resp, False
+    obj = info_class._path[-1].partition(':')[0]
+    return resp, resp.resData['%s:infData' % obj]
+
+
+def _statuses(inf_data):
+    status = inf_data.get('status') or []
+    return set(s.get('@s') if isinstance(s, dict) else s for s in status)
+
+
+def _resolve_create(info_class, key='name'):
+    def resolve(client, doc):
+        _, inf_data = _object_info(client, doc, info_class, key)
+        if inf_data is None:
+            return False
+        if inf_data is False:
+            return None
+        # it exists: it was ours to create only if we sponsor it now
+        if inf_data.get('clID') != client.clID:
+            return False
+        # ... and it was created after the command was written; if it is
+        # older, replaying gets the "object exists" error we would have had
+        created = _parse_date(inf_data.get('crDate'))
+        if created is None or client.sent_at is None:
+            return None
+        return created >= client.sent_at
+    return resolve
+
+
+def _resolve_delete(info_class, key='name'):
+    def resolve(client, doc):
+        _, inf_data = _object_info(client, doc, info_class, key)
+        if inf_data is None:
+            return True
+        if inf_data is False:
+            return None
+        return True if 'pendingDelete' in _statuses(inf_data) else False
+    return resolve
+
+
+def _resolve_renew(client, doc):
+    _, inf_data = _object_info(client, doc, EppInfoDomainCommand)
+    cur_exp_date = dpath_get(doc, doc._path).get('curExpDate')
+    if not inf_data or not cur_exp_date:
+        return None
+    # compare the date parts (YYYY-MM-DD) of the expiry dates
+    return inf_data.get('exDate', '')[:10] > str(cur_exp_date)[:10]
+
+
+def _resolve_transfer_request(client, doc):
+    """
+    Query the latest transfer of the domain: ours (``reID`` is our clID)
+    if pending or approved, not applied if it was requested by someone else
+    or there is none
+    """
+    if doc['epp']['command']['transfer'].get('@op') != 'request':
+        return None
+    node = dpath_get(doc, doc._path)
+    if not node.get('name'):
+        return None
+    query = EppTransferDomainCommand('query')
+    query.name = node['name']
+    if node.get('authInfo'):
+        query.authInfo = node['authInfo']
+    resp = EppClient.send(client, query, log_send_recv=False)
+    if resp.code in ('2301', '2303'):
+        # no transfer to query, or no such domain
+        return False
+    if not resp.ok:
+        return None
+    trn_data = resp.resData['domain:trnData']
+    if trn_data.get('reID') != client.clID:
+        return False
+    if trn_data.get('trStatus') in ('pending', 'clientApproved', 'serverApproved'):
+        return True
+    # ours but rejected or cancelled: maybe an earlier request
+    return None
+
+
+def _resolve_poll_ack(client, doc):
+    msg_id = doc['epp']['command']['poll'].get('@msgID')
+    resp = EppClient.send(client, EppPollCommand('req'), log_send_recv=False)
+    if resp.code == '1300':
+        # queue empty
+        return True
+    msg_q = resp['epp']['response'].get('msgQ')
+    if not isinstance(msg_q, dict):
+        return None
+    return msg_q.get('@id') != msg_id
+
+# pylint: enable=w0212
+
+
+class ResilientEppClient(EppClient):
+    """
+    `EppClient` that survives dropped sessions. When ``send`` fails with a
+    socket error, it reconnects and logs in again with the credentials of the
+    last successful ``login``, then:
+
+    * re-sends read-only commands (check, info, poll req, hello) right away;
+    * for mutating commands, asks the server whether the command was applied
+      (e.g. an <info> on the object of a create/delete/renew) and replays it
+      only if it was not. If it was, a response with code 1000 is returned
+      in place of the lost one. If it cannot be told (e.g. an <update>),
+      `EppUnknownOutcomeError` is raised.
+
+    ``resolvers`` maps command classes to ``resolver(client, doc)`` callables
+    returning True (applied), False (not applied) or None (unknown). They can
+    compare the dates of the server with ``sent_at``, the time the command
+    was written in the clock of the server (estimated from the ``svDate`` of
+    its greeting), to the second.
+
+    Only ``send`` is resilient: ``batchsend`` and ``windowsend`` still fail
+    with the socket error, as the outcome of every command in flight would
+    have to be resolved.
+    """
+
+    SAFE_COMMANDS = (EppHello, EppCheckCommand, EppCheckHostCommand, EppInfoCommand)
+
+    RESOLVERS = {
+        EppCreateDomainCommand: _resolve_create(EppInfoDomainCommand),
+        EppCreateHostCommand: _resolve_create(EppInfoHostCommand),
+        EppCreateContactCommand: _resolve_create(EppInfoContactCommand, key='id'),
+        EppDeleteDomainCommand: _resolve_delete(EppInfoDomainCommand),
+        EppDeleteHostCommand: _resolve_delete(EppInfoHostCommand),
+        EppDeleteContactCommand: _resolve_delete(EppInfoContactCommand, key='id'),
+        EppRenewDomainCommand: _resolve_renew,
+        EppTransferDomainCommand: _resolve_transfer_request,
+        EppPollCommand: _resolve_poll_ack,
+    }
+
+    def __init__(self, *args, **kwargs):
+        self.reconnect_attempts = kwargs.pop('reconnect_attempts', 3)
+        self.reconnect_delay = kwargs.pop('reconnect_delay', 1.0)
+        self.resolvers = dict(self.RESOLVERS)
+        self.resolvers.update(kwargs.pop('resolvers', None) or {})
+        super(ResilientEppClient, self).__init__(*args, **kwargs)
+        self.clID = None
+        self.sent_at = None
+        self._login_args = None
+        self._clock_offset = timedelta(0)
+
+    def connect(self, host=None, port=None, address_family=None):
+        super(ResilientEppClient, self).connect(host, port, address_family)
+        greeting = self.greeting['epp'].get('greeting') or {}
+        sv_date = _parse_date(greeting.get('svDate'))
+        self._clock_offset = sv_date - _utcnow() if sv_date else timedelta(0)
+
+    def server_time(self):
+        """
+        The current time in the clock of the server (naive UTC, to the second)
+        """
+        return (_utcnow() + self._clock_offset).replace(microsecond=0)
+
+    # pylint: disable=c0103
+    def login(self, clID, pw, newPW=None, raise_on_fail=True, **kwargs):
+        r = super(ResilientEppClient, self).login(
+            clID, pw, newPW=newPW, raise_on_fail=raise_on_fail, **kwargs)
+        if r.success:
+            self.clID = clID
+            kwargs.pop('clTRID', None)
+            self._login_args = (clID, newPW or pw, kwargs)
+        return r
+
+    def logout(self, clTRID=None):
+        self._login_args = None
+        return super(ResilientEppClient, self).logout(clTRID=clTRID)
+    # pylint: enable=c0103
+
+    def reconnect(self):
+        """
+        Open a new connection and log in again, retrying with a growing delay
+        """
+        clID, pw, kwargs = self._login_args
+        delay = self.reconnect_delay
+        for attempt in range(1, self.reconnect_attempts + 1):
+            if self.sock is not None:
+                self.close()
+            try:
+                self.connect(self.host, self.port)
+                EppClient.login(self, clID, pw, **kwargs)
+                return
+            except (IOError, OSError) as exp:
+                self.log.warning("reconnect attempt %d/%d failed: %s",
+                                 attempt, self.reconnect_attempts, exp)
+                if attempt == self.reconnect_attempts:
+                    raise
+                time.sleep(delay)
+                delay *= 2
+
+    def is_replay_safe(self, doc):
+        if isinstance(doc, EppPollCommand):
+            return doc['epp']['command']['poll'].get('@op') == 'req'
+        if isinstance(doc, EppTransferCommand):
+            return doc['epp']['command']['transfer'].get('@op') == 'query'
+        return isinstance(doc, self.SAFE_COMMANDS)
+
+    def resolve(self, doc):
+        """
+        Find out whether the interrupted ``doc`` was applied by the server:
+        True, False or None if it cannot be told
+        """
+        for cls in type(doc).__mro__:
+            resolver = self.resolvers.get(cls)
+            if resolver is not None:
+                return resolver(self, doc)
+        return None
+
+    def send(self, doc, *args, **kwargs):
+        self.sent_at = self.server_time()
+        try:
+            return super(ResilientEppClient, self).send(doc, *args, **kwargs)
+        except (IOError, OSError) as exp:
+            if self._login_args is None or isinstance(doc, (EppLoginCommand, EppLogoutCommand)):
+                raise
+            self.log.warning("session lost during %s: %s", type(doc).__name__, exp)
+            self.reconnect()
+
+        if self.is_replay_safe(doc):
+            return super(ResilientEppClient, self).send(doc, *args, **kwargs)
+
+        applied = self.resolve(doc)
+        if applied is False:
+            self.log.info("%s was not applied, replaying it", type(doc).__name__)
+            return super(ResilientEppClient, self).send(doc, *args, **kwargs)
+        if applied:
+            self.log.info("%s was applied before the session was lost", type(doc).__name__)
+            return EppResponse({'epp': {'response': {
+                'result': [{'@code': '1000',
+                            'msg': 'Command completed successfully (recovered after reconnect)'}],
+                'trID': {'clTRID': doc['epp']['command'].get('clTRID')},
+            }}})
+        raise EppUnknownOutcomeError(
+            "session lost during %s and its outcome is unknown" % type(doc).__name__, doc)
@@ -0,0 +1,196 @@
+"""
+Module that implements the PriorityScheduler class, ordering the commands
+sent over shared sessions by priority
+"""
+
+import heapq
+import itertools
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from .doc import (EppCheckCommand, EppCheckHostCommand, EppInfoCommand, EppPollCommand,
+                  EppRenewCommand, EppTransferCommand, EppHello)
+from .utils import monotonic
+
+
+# priority classes, most urgent first
+HIGH = 0
+NORMAL = 1
+LOW = 2
+BULK = 3
+
+# default priority by command class (the first match in the MRO wins);
+# commands not listed are NORMAL
+DEFAULT_PRIORITIES = {
+    EppRenewCommand: HIGH,
+    EppTransferCommand: HIGH,
+    EppInfoCommand: LOW,
+    EppPollCommand: LOW,
+    EppHello: LOW,
+    EppCheckCommand: BULK,
+    EppCheckHostCommand: BULK,
+}
+
+
+def pool_submitter(pool, max_workers=None):
+    """
+    Return a ``submit(doc)`` function sending commands through the sessions
+    of an `eppy.pool.EppClientPool`, from up to ``max_workers`` threads
+    (defaults to the pool's ``max_sessions``)
+    """
+    executor = ThreadPoolExecutor(max_workers=max_workers or pool.max_sessions)
+
+    def send(doc):
+        with pool.session() as client:
+            return client.send(doc)
+
+    return lambda doc: executor.submit(send, doc)
+
+
+class _Entry(object):
+    """
+    A queued command
+    """
+    # pylint: disable=too-few-public-methods
+    __slots__ = ('doc', 'priority', 'future', 'kwargs')
+
+    def __init__(self, doc, priority, future, kwargs):
+        self.doc = doc
+        self.priority = priority
+        self.future = future
+        self.kwargs = kwargs
+
+
+class PriorityScheduler(object):
+    """
+    Queue in front of shared sessions that dispatches commands by priority
+    class, so that e.g. renewals are not stuck behind a sweep of checks.
+
+    ``submit`` is the backend: a callable taking a command (plus keyword
+    arguments) and returning a `concurrent.futures.Future` of its response,
+    e.g. ``functools.partial(multiplexer.submit, endpoint='registry')`` for
+    pipelined sessions or ``pool_submitter(pool)``. At most ``max_inflight``
+    commands are handed to it at once, and at most ``caps[priority]`` of
+    each priority class.
+
+    Priorities age: every ``aging`` seconds spent in the queue are worth one
+    priority class, so low-priority work still makes progress under a steady
+    stream of urgent commands.
+    """
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(self, submit, max_inflight=10, caps=None, aging=5.0, priorities=None):
+        self.backend = submit
+        self.max_inflight = max_inflight
+        self.caps = caps or {}
+        self.aging = aging
+        self.priorities = dict(DEFAULT_PRIORITIES)
+        self.priorities.update(priorities or {})
+        self._lock = threading.Lock()
+        self._queues = {}  # priority -> heap of (deadline, seq, entry)
+        self._inflight = {}  # priority -> count
+        self._num_inflight = 0
+        self._seq = itertools.count()
+        # _pump is not reentrant: a completion firing while a pump is
+        # active (backend futures that are already done call their
+        # callbacks synchronously) only asks the active pump to go on
+        self._pumping = False
+        self._repump = False
+
+    def priority_of(self, doc):
+        for cls in type(doc).__mro__:
+            priority = self.priorities.get(cls)
+            if priority is not None:
+                return priority
+        return NORMAL
+
+    @property
+    def num_queued(self):
+        return sum(len(queue) for queue in self._queues.values())
+
+    @property
+    def num_inflight(self):
+        return self._num_inflight
+
+    def submit(self, doc, priority=None, **kwargs):
+        """
+        Queue ``doc`` and return a future of its response. ``priority``
+        defaults to the priority of the command class.
+        """
+        if priority is None:
+            priority = self.priority_of(doc)
+        future = Future()
+        # the command is due when it has waited ``priority`` aging periods,
+        # so the queues stay ordered without re-sorting as time passes
+        deadline = monotonic() + priority * self.aging
+        with self._lock:
+            heapq.heappush(self._queues.setdefault(priority, []),
+                           (deadline, next(self._seq), _Entry(doc, priority, future, kwargs)))
+        self._pump()
+        return future
+
+    def _next(self):
+        """
+        Pop the entry with the earliest deadline among the priority classes
+        below their cap (called with the lock held)
+        """
+        if self._num_inflight >= self.max_inflight:
+            return None
+        best = None
+        for priority, queue in self._queues.items():
+            if not queue:
+                continue
+            cap = self.caps.get(priority)
+            if cap is not None and self._inflight.get(priority, 0) >= cap:
+                continue
+            if best is None or queue[0] < self._queues[best][0]:
+                best = priority
+        if best is None:
+            return None
+        entry = heapq.heappop(self._queues[best])[2]
+        self._inflight[best] = self._inflight.get(best, 0) + 1
+        self._num_inflight += 1
+        return entry
+
+    def _pump(self):
+        with self._lock:
+            if self._pumping:
+                self._repump = True
+                return
+            self._pumping = True
+        while True:
+            with self._lock:
+                entry = self._next()
+                if entry is None:
+                    if not self._repump:
+                        self._pumping = False
+                        return
+                    self._repump = False
+                    continue
+            if not entry.future.set_running_or_notify_cancel():
+                self._done(entry)
+                continue
+            try:
+                backend_future = self.backend(entry.doc, **entry.kwargs)
+            except Exception as exp:  # pylint: disable=broad-except
+                entry.future.set_exception(exp)
+                self._done(entry)
+                continue
+            backend_future.add_done_callback(
+                lambda fut, entry=entry: self._complete(entry, fut))
+
+    def _done(self, entry):
+        with self._lock:
+            self._inflight[entry.priority] -= 1
+            self._num_inflight -= 1
+
+    def _complete(self, entry, backend_future):
+        self._done(entry)
+        try:
+            resp = backend_future.result()
+        except BaseException as exp:  # pylint: disable=broad-except
+            # including the CancelledError of a cancelled backend future
+            entry.future.set_exception(exp)
+        else:
+            entry.future.set_result(resp)
+        self._pump()
@@ -0,0 +1,115 @@
+"""
+Module that implements status-only responses: the result code and
+transaction ids are scanned from the raw frame bytes, without parsing the
+XML
+"""
+
+import re
+
+from .doc import EppResponse
+
+
+_RESULT_CODE_RE = re.compile(br'<(?:[\w.-]+:)?result\s+code\s*=\s*["\'](\d{4})["\']')
+_TRID_RE = re.compile(br'<(?:[\w.-]+:)?(clTRID|svTRID)>([^<]*)</')
+
+
+def _as_bytes(buf):
+    # frames from `EppClient.read_frame` are memoryviews
+    return buf.tobytes() if isinstance(buf, memoryview) else buf
+
+
+def _trid_bounds(buf):
+    """
+    Bounds of the <trID> of the response in ``buf``. It is the last child
+    of <response>, so it is searched from the end, past any <clTRID> a
+    message in <resData> may carry (the whole frame if it is not found).
+    """
+    end = buf.rfind(b'trID>')
+    start = buf.rfind(b'trID>', 0, end) if end > 0 else -1
+    if start < 0:
+        return 0, len(buf)
+    return start, end
+
+
+def _decode(value):
+    if b'&' in value:
+        # an entity or character reference: leave it to the XML parser
+        raise ValueError
+    return value.decode('utf-8').strip()
+
+
+def scan_cltrid(buf):
+    """
+    Return the clTRID of the response frame ``buf`` (``None`` if it has
+    none or it cannot be read without parsing)
+    """
+    buf = _as_bytes(buf)
+    start, end = _trid_bounds(buf)
+    for match in _TRID_RE.finditer(buf, start, end):
+        if match.group(1) == b'clTRID':
+            try:
+                return _decode(match.group(2))
+            except ValueError:
+                return None
+    return None
+
+
+class StatusResponse(object):
+    """
+    A response of which only the result code and the transaction ids were
+    read. It has the status properties of `EppResponse`.
+    """
+    __slots__ = ('code', 'cltrid', 'svtrid')
+
+    def __init__(self, code, cltrid=None, svtrid=None):
+        self.code = code
+        self.cltrid = cltrid
+        self.svtrid = svtrid
+
+    # pylint: disable=C0103
+    @property
+    def ok(self):
+        return self.code == '1000'
+
+    @property
+    def pending(self):
+        return self.code == '1001'
+
+    @property
+    def success(self):
+        return self.code in ('1000', '1001')
+
+    def __repr__(self):
+        return '<StatusResponse %s clTRID=%s svTRID=%s>' % (self.code, self.cltrid, self.svtrid)
+
+
+def scan_status(buf):
+    """
+    Return the `StatusResponse` of the response frame ``buf``, or ``None``
+    if it cannot be read without parsing
+    """
+    buf = _as_bytes(buf)
+    match = _RESULT_CODE_RE.search(buf)
+    if match is None:
+        return None
+    trids = {}
+    start, end = _trid_bounds(buf)
+    try:
+        for trid in _TRID_RE.finditer(buf, start, end):
+            trids.setdefault(trid.group(1), _decode(trid.group(2)))
+    except ValueError:
+        return None
+    return StatusResponse(match.group(1).decode('ascii'),
+                          trids.get(b'clTRID'), trids.get(b'svTRID'))
+
+
+def parse_status(buf, extra_nsmap=None, strip_hints=False):
+    """
+    Return a `StatusResponse` for a frame with a result code below 2000,
+    the full `EppResponse` for errors (whose messages and values matter) or
+    frames the scanner cannot read
+    """
+    status = scan_status(buf)
+    if status is not None and status.code < '2000':
+        return status
+    return EppResponse.from_xml(buf, extra_nsmap=extra_nsmap, strip_hints=strip_hints)
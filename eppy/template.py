@@ -0,0 +1,221 @@
+"""
+Module that implements precompiled byte templates for frequently sent
+commands
+"""
+
+import uuid
+from xml.etree import ElementTree
+
+from six import PY2, PY3, text_type, iteritems
+
+from .doc import EppDoc, EppCommand
+from .xmldict import XmlDictObject
+from .utils import gen_trid
+
+
+# pylint: disable=protected-access
+# the escaping ElementTree itself applies when serializing
+_ESCAPE_TEXT = ElementTree._escape_cdata
+_ESCAPE_ATTRIB = ElementTree._escape_attrib
+# pylint: enable=protected-access
+
+CLTRID_PATH = ('epp', 'command', 'clTRID')
+
+
+def _encode(value, escape):
+    # same encoding as ``ElementTree.tostring``
+    return escape(text_type(value)).encode('us-ascii', 'xmlcharrefreplace')
+
+
+def _set_path(dct, path, value):
+    for key in path[:-1]:
+        child = dct.get(key)
+        if child is None:
+            child = dct[key] = {}
+        elif not isinstance(child, dict):
+            # an element with both text and attributes
+            child = dct[key] = {'_text': child}
+        dct = child
+    if isinstance(dct.get(path[-1]), dict):
+        dct[path[-1]]['_text'] = value
+    else:
+        dct[path[-1]] = value
+
+
+def _new_doc(cls, dct, nsmap=None, extra_nsmap=None):
+    # bypass the constructors of commands taking arguments (e.g. `EppPollCommand`)
+    doc = cls.__new__(cls)
+    # pylint: disable=non-parent-init-called
+    EppDoc.__init__(doc, dct, nsmap=nsmap, extra_nsmap=extra_nsmap)
+    return doc
+
+
+class FilledCommand(object):
+    """
+    A command rendered from a `Template`. It stands in for the `EppDoc` in
+    ``EppClient.send``, ``windowsend``, ``batchsend`` and
+    ``EppMultiplexer.submit`` (but not with a codec): it serializes with
+    ``to_xml`` or ``bytes()`` and is matched to its response by the clTRID
+    ``ensure_clTRID`` returns.
+    """
+    __slots__ = ('template', 'xml', 'clTRID')
+
+    def __init__(self, template, xml, clTRID=None):  # pylint: disable=c0103
+        self.template = template
+        self.xml = xml
+        self.clTRID = clTRID  # pylint: disable=c0103
+
+    @property
+    def _path(self):
+        return self.template.cls._path
+
+    @property
+    def _plan(self):
+        return self.template.cls._plan
+
+    def to_xml(self, force_prefix=True, pretty=True):  # pylint: disable=w0613
+        return self.xml
+
+    if PY2:
+        def __str__(self):
+            return self.xml
+    elif PY3:
+        def __str__(self):
+            return str(self.xml, 'utf-8')
+
+        def __bytes__(self):
+            return self.xml
+
+    def ensure_clTRID(self):  # pylint: disable=c0103
+        return self.clTRID
+
+    def normalize_response(self, respdoc):
+        self.template.prototype.normalize_response(respdoc)
+
+
+class Template(object):
+    """
+    Byte template of an `EppDoc` class with slots for the values that change
+    from one command to the next, e.g.::
+
+        info = Template(EppInfoDomainCommand, {'name': 'name'}, cltrid=True)
+        check = Template(EppCheckDomainCommand, {'names': 'name'}, multi=('names',))
+        client.send(info.command(name='example.com'))
+        buf = check.fill(names=['a.com', 'b.com'], clTRID='ABC-1')
+
+    ``slots`` maps slot names to paths relative to the ``_path`` of ``cls``
+    (tuples or ``/``-separated strings, a last component starting with ``@``
+    being an attribute). Slots listed in ``multi`` take a non-empty list of
+    values, each becoming one element. ``cltrid`` adds a ``clTRID`` slot,
+    filled with a generated value when not given. ``base`` is the dict (or
+    document) the other, fixed parts of the command are taken from.
+
+    The template is made by serializing the command once with marker values,
+    so filling it gives exactly the bytes of ``to_xml(force_prefix=True)``
+    for the same values.
+    """
+
+    def __init__(self, cls, slots, multi=(), cltrid=False, base=None, extra_nsmap=None):
+        self.cls = cls
+        self.multi = frozenset(multi)
+        self.cltrid = cltrid and issubclass(cls, EppCommand)
+        # pylint: disable=protected-access
+        self.prototype = _new_doc(cls, XmlDictObject._unwrap(base) if base else None,
+                                  nsmap=getattr(base, '_nsmap', None), extra_nsmap=extra_nsmap)
+        specs = []
+        for name, path in iteritems(slots):
+            if not isinstance(path, tuple):
+                path = tuple(path.split('/'))
+            specs.append((name, cls._path + path))
+        if self.cltrid:
+            specs.append(('clTRID', CLTRID_PATH))
+        self._specs = specs
+        self._parts, self._slots = self._compile(specs)
+
+    def _blank_doc(self):
+        # pylint: disable=protected-access
+        return _new_doc(self.cls, self.prototype.unwrap(), nsmap=self.prototype._nsmap.copy())
+
+    def _compile(self, specs):
+        doc = self._blank_doc()
+        token = uuid.uuid4().hex
+        markers = []  # (marker, slot name, is the second marker of a multi slot)
+        for idx, (name, path) in enumerate(specs):
+            marker = 'slot%da%s' % (idx, token)
+            if name in self.multi:
+                second = 'slot%db%s' % (idx, token)
+                _set_path(doc, path, [marker, second])
+                markers.append((second, name, True))
+            else:
+                _set_path(doc, path, marker)
+            markers.append((marker, name, False))
+        buf = doc.to_xml(force_prefix=True)
+
+        found = []
+        for marker, name, second in markers:
+            encoded = marker.encode('ascii')
+            pos = buf.find(encoded)
+            if pos < 0 or buf.find(encoded, pos + 1) >= 0:
+                raise ValueError("slot %s could not be located in the template" % name)
+            found.append((pos, len(encoded), name, second))
+        found.sort()
+
+        escapes = dict((name, _ESCAPE_ATTRIB if path[-1].startswith('@') else _ESCAPE_TEXT)
+                       for name, path in specs)
+        parts = []
+        slots = []  # (name, escape, separator of multi values)
+        end = 0
+        for pos, size, name, second in found:
+            if second:
+                # what lies between two values of a multi slot
+                slots[-1] = (name, escapes[name], buf[end:pos])
+            else:
+                parts.append(buf[end:pos])
+                slots.append((name, escapes[name], None))
+            end = pos + size
+        parts.append(buf[end:])
+        return parts, slots
+
+    def fill(self, **values):
+        """
+        Return the serialized command with the slots set to ``values``
+        """
+        if self.cltrid and not values.get('clTRID'):
+            values['clTRID'] = gen_trid()
+        parts = self._parts
+        out = [parts[0]]
+        for idx, (name, escape, sep) in enumerate(self._slots):
+            try:
+                value = values[name]
+            except KeyError:
+                raise ValueError("no value for slot %s" % name)
+            if sep is None:
+                if value is None or (value == '' and escape is _ESCAPE_TEXT):
+                    # left out or written as an empty element by to_xml
+                    return self._render(values)
+                out.append(_encode(value, escape))
+            else:
+                if not value or isinstance(value, (text_type, bytes)):
+                    raise ValueError("slot %s takes a non-empty list of values" % name)
+                if escape is _ESCAPE_TEXT and '' in value:
+                    return self._render(values)
+                out.append(sep.join(_encode(val, escape) for val in value))
+            out.append(parts[idx + 1])
+        return b''.join(out)
+
+    def _render(self, values):
+        """
+        Serialize the command for values the byte template cannot express
+        """
+        doc = self._blank_doc()
+        for name, path in self._specs:
+            _set_path(doc, path, values[name])
+        return doc.to_xml(force_prefix=True)
+
+    def command(self, **values):
+        """
+        Same as ``fill`` but returns a `FilledCommand` that can be sent
+        """
+        if self.cltrid and not values.get('clTRID'):
+            values['clTRID'] = gen_trid()
+        return FilledCommand(self, self.fill(**values), values.get('clTRID'))
@@ -0,0 +1,184 @@
+"""
+Module that implements per-command phase timing of `EppClient.send`
+"""
+
+import bisect
+import threading
+
+
+PHASES = ('serialize', 'write', 'wait', 'read', 'parse', 'normalize')
+
+
+class PhaseTimings(object):
+    """
+    Timings (in seconds, from a monotonic clock) of the phases of one
+    ``send``:
+
+    * ``serialize``: ``to_xml`` (or the codec)
+    * ``write``: writing the frame to the socket
+    * ``wait``: until the header of the response frame arrived (server time)
+    * ``read``: receiving the rest of the frame (with ``stream_parse``, this
+      includes parsing)
+    * ``parse``: building the `EppResponse`, stripping hints and applying
+      the response normalizers of the command on the way
+    * ``normalize``: ``normalize_response``, with a codec or if the command
+      class overrides it (0 otherwise)
+
+    plus ``bytes_out`` / ``bytes_in`` (frame payloads), the command type (see
+    `eppy.doc.command_type`) and the result code.
+    """
+    __slots__ = ('cmdtype', 'code', 'bytes_out', 'bytes_in') + PHASES
+
+    # pylint: disable=too-many-arguments
+    def __init__(self, cmdtype, code, bytes_out, bytes_in, serialize, write, wait,
+                 read, parse, normalize):
+        self.cmdtype = cmdtype
+        self.code = code
+        self.bytes_out = bytes_out
+        self.bytes_in = bytes_in
+        self.serialize = serialize
+        self.write = write
+        self.wait = wait
+        self.read = read
+        self.parse = parse
+        self.normalize = normalize
+
+    @property
+    def total(self):
+        return sum(getattr(self, phase) for phase in PHASES)
+
+    def __repr__(self):
+        return '<PhaseTimings %s code=%s out=%d in=%d %s>' % (
+            self.cmdtype, self.code, self.bytes_out, self.bytes_in,
+            ' '.join('%s=%.6f' % (phase, getattr(self, phase)) for phase in PHASES))
+
+
+class CallbackSink(object):
+    """
+    Passes each `PhaseTimings` to ``callback``
+    """
+    # pylint: disable=too-few-public-methods
+
+    def __init__(self, callback):
+        self.callback = callback
+
+    def record(self, timings):
+        self.callback(timings)
+
+
+class MultiSink(object):
+    """
+    Forwards each `PhaseTimings` to several sinks
+    """
+    # pylint: disable=too-few-public-methods
+
+    def __init__(self, *sinks):
+        self.sinks = sinks
+
+    def record(self, timings):
+        for sink in self.sinks:
+            sink.record(timings)
+
+
+# bucket upper bounds in seconds: 10us to ~100s, four buckets per decade
+DEFAULT_BOUNDS = tuple(round(m * 10 ** e, 9) for e in range(-5, 2)
+                       for m in (1, 1.8, 3.2, 5.6)) + (100.0,)
+
+
+class Histogram(object):
+    """
+    Fixed-bucket histogram of durations
+    """
+    __slots__ = ('bounds', 'counts', 'count', 'sum', 'max')
+
+    def __init__(self, bounds=DEFAULT_BOUNDS):
+        self.bounds = bounds
+        # the last bucket holds values over the last bound
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def add(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    @property
+    def mean(self):
+        return self.sum / self.count if self.count else 0.0
+
+    def percentile(self, pct):
+        """
+        Upper bound of the bucket holding the ``pct`` (0-100) percentile
+        (at most the largest value seen)
+        """
+        if not self.count:
+            return 0.0
+        rank = self.count * pct / 100.0
+        seen = 0
+        for idx, num in enumerate(self.counts):
+            seen += num
+            if seen >= rank and num:
+                return min(self.bounds[idx], self.max) if idx < len(self.bounds) else self.max
+        return self.max
+
+
+class HistogramSink(object):
+    """
+    In-process aggregate: one `Histogram` per command type and phase (plus
+    ``'total'``), and byte and result code counters per command type.
+    Thread-safe, so one sink can be shared by the clients of a pool.
+    """
+
+    def __init__(self, bounds=DEFAULT_BOUNDS):
+        self.bounds = bounds
+        self.histograms = {}  # (cmdtype, phase) -> Histogram
+        self.bytes_out = {}
+        self.bytes_in = {}
+        self.codes = {}  # (cmdtype, code) -> count
+        self._lock = threading.Lock()
+
+    def _histogram(self, cmdtype, phase):
+        hist = self.histograms.get((cmdtype, phase))
+        if hist is None:
+            hist = self.histograms[(cmdtype, phase)] = Histogram(self.bounds)
+        return hist
+
+    def record(self, timings):
+        cmdtype = timings.cmdtype
+        with self._lock:
+            for phase in PHASES:
+                self._histogram(cmdtype, phase).add(getattr(timings, phase))
+            self._histogram(cmdtype, 'total').add(timings.total)
+            self.bytes_out[cmdtype] = self.bytes_out.get(cmdtype, 0) + timings.bytes_out
+            self.bytes_in[cmdtype] = self.bytes_in.get(cmdtype, 0) + timings.bytes_in
+            key = (cmdtype, timings.code)
+            self.codes[key] = self.codes.get(key, 0) + 1
+
+    def get(self, cmdtype, phase='total'):
+        return self.histograms.get((cmdtype, phase))
+
+    def summary(self, pcts=(50, 90, 99)):
+        """
+        Return one line per command type and phase with the count, mean, max
+        and percentiles (in milliseconds)
+        """
+        lines = []
+        with self._lock:
+            for (cmdtype, phase), hist in sorted(self.histograms.items(),
+                                                 key=lambda item: (str(item[0][0]), item[0][1])):
+                lines.append('%s %s n=%d mean=%.3fms max=%.3fms %s' % (
+                    cmdtype, phase, hist.count, hist.mean * 1000, hist.max * 1000,
+                    ' '.join('p%d=%.3fms' % (pct, hist.percentile(pct) * 1000)
+                             for pct in pcts)))
+        return '\n'.join(lines)
+
+    def clear(self):
+        with self._lock:
+            self.histograms.clear()
+            self.bytes_out.clear()
+            self.bytes_in.clear()
+            self.codes.clear()
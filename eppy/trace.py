@@ -0,0 +1,102 @@
+"""
+Module that implements wire tracing of EPP exchanges
+"""
+
+import logging
+import time
+from collections import deque
+
+from . import xmlbackend
+
+
+class LazyText(object):
+    """
+    Wraps a payload (bytes, memoryview or element) and only decodes it when
+    it is actually formatted, e.g. by a logging handler
+    """
+    __slots__ = ('payload',)
+
+    def __init__(self, payload):
+        self.payload = payload
+
+    def __str__(self):
+        payload = self.payload
+        if payload is None:
+            return ''
+        if isinstance(payload, memoryview):
+            payload = payload.tobytes()
+        elif not isinstance(payload, bytes):
+            # a parsed element (see ``EppClient(stream_parse=True)``)
+            payload = xmlbackend.tostring(payload)
+        return payload.decode('utf-8')
+
+
+class Exchange(object):
+    """
+    One command and its response as seen on the wire
+    """
+    __slots__ = ('timestamp', 'peer', 'request', 'response', 'code')
+
+    def __init__(self, timestamp, peer, request, response, code):
+        self.timestamp = timestamp
+        self.peer = peer
+        self.request = request
+        self.response = response
+        self.code = code
+
+    def __str__(self):
+        return "%s %s code=%s\nSEND: %s\nRECV: %s" % (
+            time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(self.timestamp)),
+            self.peer, self.code, LazyText(self.request), LazyText(self.response))
+
+
+class WireTrace(object):
+    """
+    Keeps the most recent exchanges of a client in a bounded ring buffer, to
+    be dumped when something goes wrong.
+
+    Only one in ``sample`` successful exchanges is kept (``errors_only``
+    keeps none); exchanges whose result is not 1000/1001 are always kept.
+    Payloads are stored as received and only decoded when formatted. If a
+    ``logger`` is given, kept exchanges are also logged at ``level``.
+    """
+
+    def __init__(self, maxlen=100, sample=1, errors_only=False, logger=None,
+                 level=logging.DEBUG):
+        self.exchanges = deque(maxlen=maxlen)
+        self.sample = sample
+        self.errors_only = errors_only
+        self.logger = logger
+        self.level = level
+        self._seen = 0
+
+    def record(self, peer, request, response, resp):
+        """
+        Called by the client for each exchange. ``response`` is the raw
+        payload (a memoryview only valid until the next read, or an element)
+        and ``resp`` the parsed `EppResponse`.
+        """
+        self._seen += 1
+        code = resp.code if resp is not None else None
+        if code in ('1000', '1001') and (
+                self.errors_only or (self.sample > 1 and self._seen % self.sample)):
+            return
+        if isinstance(response, memoryview):
+            response = response.tobytes()
+        exchange = Exchange(time.time(), peer, request, response, code)
+        self.exchanges.append(exchange)
+        if self.logger is not None and self.logger.isEnabledFor(self.level):
+            self.logger.log(self.level, "%s", exchange)
+
+    def dump(self, logger=None, level=logging.ERROR):
+        """
+        Return the buffered exchanges as text, oldest first, and log them to
+        ``logger`` if given
+        """
+        text = '\n'.join(str(exchange) for exchange in self.exchanges)
+        if logger is not None:
+            logger.log(level, "last %d exchanges:\n%s", len(self.exchanges), text)
+        return text
+
+    def clear(self):
+        self.exchanges.clear()
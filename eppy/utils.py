@@ -1,4 +1,8 @@
 from random import choice
+try:
+    from time import monotonic
+except ImportError:  # Python 2
+    from time import time as monotonic
 
 
 TRID_CSET = '0123456789abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ'
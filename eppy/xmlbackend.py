@@ -0,0 +1,133 @@
+"""
+Module that selects the XML library used to parse EPP documents: lxml when
+it is installed, the standard library's ElementTree otherwise.
+
+Serialization always uses ElementTree: ``dict2xml`` builds elements with
+literal ``prefix:name`` tags and ``xmlns`` attributes, which lxml rejects.
+"""
+
+import threading
+from xml.etree import ElementTree
+
+from six import StringIO, PY2, text_type
+
+try:
+    from lxml import etree as lxml_etree
+except ImportError:
+    lxml_etree = None
+
+
+class StdlibBackend(object):
+    """
+    ``xml.etree.ElementTree``
+    """
+    name = 'stdlib'
+
+    @staticmethod
+    def fromstring(buf):
+        if PY2:
+            return ElementTree.parse(StringIO(buf)).getroot()
+        return ElementTree.fromstring(buf)
+
+    @staticmethod
+    def feed_parser():
+        """
+        Return a parser with ``feed(chunk)`` and ``close()`` methods, the
+        latter returning the root element
+        """
+        return ElementTree.XMLParser()
+
+    @staticmethod
+    def tostring(elem):
+        return ElementTree.tostring(elem)
+
+
+class _LxmlFeedParser(object):
+    __slots__ = ('parser',)
+
+    def __init__(self, parser):
+        self.parser = parser
+
+    def feed(self, chunk):
+        if isinstance(chunk, memoryview):
+            chunk = chunk.tobytes()
+        self.parser.feed(chunk)
+
+    def close(self):
+        return self.parser.close()
+
+
+class LxmlBackend(object):
+    """
+    ``lxml.etree``. Comments and processing instructions are dropped while
+    parsing (as ElementTree does) so that both backends give the same
+    trees, and entities are neither resolved nor fetched.
+    """
+    name = 'lxml'
+
+    def __init__(self):
+        # lxml parsers must not be shared between threads
+        self._local = threading.local()
+
+    @staticmethod
+    def _new_parser(encoding=None):
+        return lxml_etree.XMLParser(resolve_entities=False, no_network=True,
+                                    remove_comments=True, remove_pis=True, encoding=encoding)
+
+    def fromstring(self, buf):
+        if isinstance(buf, text_type):
+            # lxml refuses text with an encoding declaration: parse it as
+            # UTF-8 whatever the declaration says, as ElementTree does
+            buf = buf.encode('utf-8')
+            parser = getattr(self._local, 'text_parser', None)
+            if parser is None:
+                parser = self._local.text_parser = self._new_parser('utf-8')
+            return lxml_etree.fromstring(buf, parser)
+        parser = getattr(self._local, 'parser', None)
+        if parser is None:
+            parser = self._local.parser = self._new_parser()
+        if isinstance(buf, memoryview):
+            buf = buf.tobytes()
+        return lxml_etree.fromstring(buf, parser)
+
+    def feed_parser(self):
+        return _LxmlFeedParser(self._new_parser())
+
+    @staticmethod
+    def tostring(elem):
+        return lxml_etree.tostring(elem)
+
+
+BACKENDS = {'stdlib': StdlibBackend}
+if lxml_etree is not None:
+    BACKENDS['lxml'] = LxmlBackend
+
+_backend = LxmlBackend() if lxml_etree is not None else StdlibBackend()
+
+
+def get_backend():
+    return _backend
+
+
+def set_backend(name):
+    """
+    Select the backend (``'lxml'`` or ``'stdlib'``) used from now on
+    """
+    global _backend  # pylint: disable=global-statement
+    try:
+        _backend = BACKENDS[name]()
+    except KeyError:
+        raise ValueError("XML backend %s is not available" % name)
+    return _backend
+
+
+def fromstring(buf):
+    return _backend.fromstring(buf)
+
+
+def feed_parser():
+    return _backend.feed_parser()
+
+
+def tostring(elem):
+    return _backend.tostring(elem)
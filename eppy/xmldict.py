@@ -9,38 +9,18 @@ functions to convert an XML file into a python dict, back and forth
 #         modified to handle attributes, namespaces..
 
 __author__ = "Wil Tan <wil@cloudregistry.net>"
+import sys
+import threading
 from xml.etree import ElementTree
-from six import StringIO, iteritems, text_type, PY2, PY3
-
-# hack: LCGCMT had the py-2.5 xml.etree module hidden by mistake.
-#       this is to import it, by hook or by crook
-
-
-def import_etree():
-    import xml
-    # first try the usual way
-    try:
-        import xml.etree
-        return xml.etree
-    except ImportError:
-        pass
-    # do it by hook or by crook...
-    import os
-    import imp
-    xml_site_package = os.path.join(os.path.dirname(os.__file__), 'xml')
-    m = imp.find_module('etree', [xml_site_package])
-
-    etree = imp.load_module('xml.etree', *m)
-    setattr(xml, 'etree', etree)
-    return etree
-
-etree = import_etree()
-
+from six import iteritems, text_type
+from six.moves import intern  # pylint: disable=redefined-builtin
+from . import xmlbackend
 
 # module data ----------------------------------------------------------------
 __all__ = [
     'xml2dict',
     'dict2xml',
+    'dict2bytes',
 ]
 
 _BASE_NSMAP = {
@@ -50,6 +30,98 @@ _BASE_NSMAP = {
 # module implementation ------------------------------------------------------
 
 
+_NSMAP_R_CACHE = {}
+
+
+def reverse_nsmap(nsmap):
+    """
+    Return the URI -> prefix map of ``nsmap``. The result is shared between
+    callers with the same ``nsmap`` and must not be modified.
+    """
+    key = frozenset(iteritems(nsmap))
+    nsmap_r = _NSMAP_R_CACHE.get(key)
+    if nsmap_r is None:
+        nsmap_r = {}
+        # build reverse map
+        for prefix, uri in iteritems(nsmap):
+            if uri in nsmap_r and not prefix:  # default prefix should not override anything
+                continue                # already in the rmap override anything already in the rmap
+            nsmap_r[uri] = prefix
+        if len(_NSMAP_R_CACHE) < 256:
+            _NSMAP_R_CACHE[key] = nsmap_r
+    return nsmap_r
+
+
+class ChildOrder(object):
+    """
+    Compiled form of a childorder dict (``{'__order': names, tag: {...}}``):
+    the position of each child name and the `ChildOrder` of each child
+    """
+    __slots__ = ('index', 'children')
+
+    def __init__(self, childorder=None):
+        childorder = childorder or {}
+        self.index = order_index(childorder.get('__order') or ())
+        self.children = dict((tag, ChildOrder(sub)) for tag, sub in iteritems(childorder)
+                             if tag != '__order')
+
+    def child(self, tag):
+        return self.children.get(tag, _NO_ORDER)
+
+
+_ORDER_INDEXES = {}
+
+
+def order_index(order):
+    """
+    Return a dict giving the position of each name in ``order``. Indexes of
+    tuples (such as the ones in `eppy.childorder`) are computed only once.
+    """
+    if isinstance(order, tuple):
+        index = _ORDER_INDEXES.get(order)
+        if index is None:
+            index = _ORDER_INDEXES[order] = dict((name, i) for i, name in enumerate(order))
+        return index
+    return dict((name, i) for i, name in enumerate(order))
+
+
+_NO_ORDER = ChildOrder()
+_LOCAL_NAMES = {}
+
+
+def _local_name(tag):
+    name = _LOCAL_NAMES.get(tag)
+    if name is None:
+        name = _LOCAL_NAMES[tag] = tag.rpartition(':')[2]
+    return name
+
+
+_MISSING = object()
+
+
+class NoSuchNodeError(AttributeError):
+    """
+    Raised on attribute access to a missing node. The message shows the
+    whole document, so it is only formatted when the error is displayed:
+    ``hasattr`` and ``getattr`` with a default stay cheap.
+    """
+
+    # raised as ``NoSuchNodeError(doc, items, item)``: the arguments are only
+    # stored, with no __init__ of our own to run
+
+    def __str__(self):
+        if len(self.args) != 3:
+            return super(NoSuchNodeError, self).__str__()
+        doc, items, item = self.args
+        # we are calling the `dict` version of __str__ in case the regular
+        # __str__ implementation got overridden
+        # by a subclass that somehow calls this method again causing an unterminated recursion
+        return "no such node (%s/%s) in: %r (self=%s)" % ('/'.join(doc._path),
+                                                          item,
+                                                          items,
+                                                          dict.__str__(doc))
+
+
 class XmlDictObject(dict):
     _path = ()
     _childorder = {}  # relative to _path; only useful if defined at the same
@@ -68,30 +140,29 @@ class XmlDictObject(dict):
         nsmap.update(extra_nsmap or {})
         self._nsmap = nsmap
 
-        nsmap_r = {}
-        # build reverse map
-        for prefix, uri in iteritems(nsmap):
-            if uri in nsmap_r and not prefix:  # default prefix should not override anything
-                continue                # already in the rmap override anything already in the rmap
-            nsmap_r[uri] = prefix
-        self._nsmap_r = nsmap_r
+        self._nsmap_r = reverse_nsmap(nsmap)
 
         self.__initialized = True
 
+    def _path_node(self):
+        """
+        Return the dict at ``_path``, the one attributes are read from and
+        written to
+        """
+        items = self
+        for path in self._path:
+            items = items[path]
+        return items
+
     def __getattr__(self, item):
+        # same as `_path_node`, inlined on this hot path
         items = self
         for path in self._path:
             items = items[path]
-        if item in items:
-            return items[item]
-        else:
-            # we are calling the `dict` version of __str__ in case the regular
-            # __str__ implementation got overridden
-            # by a subclass that somehow calls this method again causing an unterminated recursion
-            raise AttributeError("no such node (%s/%s) in: %r (self=%s)" % ('/'.join(self._path),
-                                                                            item,
-                                                                            items,
-                                                                            dict.__str__(self)))
+        value = items.get(item, _MISSING)
+        if value is _MISSING:
+            raise NoSuchNodeError(self, items, item)
+        return value
 
     def __setattr__(self, item, value):
         if '_XmlDictObject__initialized' not in self.__dict__:
@@ -102,23 +173,16 @@ class XmlDictObject(dict):
             super(XmlDictObject, self).__setattr__(item, value)
             return
 
-        items = self
-        for path in self._path:
-            items = items.__getitem__(path)
-
         if isinstance(value, dict):
             value = XmlDictObject(value)
-        return items.__setitem__(item, value)
+        return self._path_node().__setitem__(item, value)
 
     def __delattr__(self, item):
         if item.startswith("__"):
             super(XmlDictObject, self).__delattr__(item)
             return
 
-        items = self
-        for path in self._path:
-            items = items.__getitem__(path)
-        return items.__delitem__(item)
+        return self._path_node().__delitem__(item)
 
     def __str__(self):
         if '_text' in self:
@@ -146,44 +210,83 @@ class XmlDictObject(dict):
         else:
             return x
 
-    def to_xml(self, childorder, force_prefix=False):
-        el = dict2xml(self, childorder, force_prefix=force_prefix)
-        indent(el)
-        return ElementTree.tostring(el)
+    def to_xml(self, childorder, force_prefix=False, pretty=True):
+        """
+        :param childorder: a childorder dict or a compiled `ChildOrder`
+        :param pretty: indent the output; see `dict2bytes`
+        """
+        return dict2bytes(self, childorder, force_prefix=force_prefix, pretty=pretty)
+
+    @classmethod
+    def from_xml(cls, buf, default_prefix=None, extra_nsmap=None, **kwargs):
+        """
+        :param kwargs: ``strip_hints`` and ``normalizers``, see `xml2dict`
+        """
+        root = xmlbackend.fromstring(buf)
+        return cls.from_element(root, default_prefix=default_prefix, extra_nsmap=extra_nsmap,
+                                **kwargs)
 
     @classmethod
-    def from_xml(cls, buf, default_prefix=None, extra_nsmap=None):
-        if PY2:
-            root = ElementTree.parse(StringIO(buf)).getroot()
-        else: 
-            root = ElementTree.fromstring(buf)
-        
+    def from_element(cls, root, default_prefix=None, extra_nsmap=None,
+                     strip_hints=False, normalizers=None):
+        """build an instance from an already parsed element (ElementTree or lxml)"""
         rv = xml2dict(
             root,
             outerclass=cls,
             default_prefix=default_prefix,
             multi_nodes=cls._multi_nodes,
-            extra_nsmap=extra_nsmap)
+            extra_nsmap=extra_nsmap,
+            strip_hints=strip_hints,
+            normalizers=normalizers)
         return rv
 
     def unwrap(self):
         return XmlDictObject._unwrap(self)
 
 
+class XmlNode(XmlDictObject):
+    """
+    `XmlDictObject` for the elements of a parsed document. The same dict and
+    attribute access, but it only keeps a reference to the namespace map of
+    its document instead of a copy and a reverse map of its own.
+    """
+    __slots__ = ('_nsmap',)
+
+    # pylint: disable=super-init-not-called
+    def __init__(self, initdict=None, nsmap=None):
+        dict.__init__(self, initdict or ())
+        object.__setattr__(self, '_nsmap', _BASE_NSMAP if nsmap is None else nsmap)
+
+    @property
+    def _nsmap_r(self):
+        return reverse_nsmap(self._nsmap)
+
+    def __setattr__(self, item, value):
+        if item.startswith("__") or item == '_nsmap':
+            object.__setattr__(self, item, value)
+            return
+        if isinstance(value, dict):
+            value = XmlDictObject(value)
+        self[item] = value
+
+
+def _sorted_items(dictitem, childorder):
+    ordr = dictitem.get('_order')
+    nodeorder = order_index(ordr) if ordr else childorder.index
+    if nodeorder:
+        return sorted(iteritems(dictitem),
+                      key=lambda x: nodeorder.get(_local_name(x[0]), 0))
+    return iteritems(dictitem)
+
+
 def _dict2xml_recurse(parent, dictitem, nsmap, current_prefixes,
                       childorder, force_prefix=False):
     """
     :param nsmap: is a dict, can be `{}`
     :param current_prefixes: is a set
-    :param childorder: is a dict, can be `{}`
+    :param childorder: is a `ChildOrder`
     """
-    if '_order' in dictitem or '__order' in childorder:
-        ordr = dictitem.get('_order') or childorder.get('__order', [])
-        nodeorder = dict((name, i) for i, name in enumerate(ordr))
-        items = sorted(iteritems(dictitem),
-                       key=lambda x: nodeorder.get(x[0].split(":")[-1], 0))
-    else:
-        items = iteritems(dictitem)
+    items = _sorted_items(dictitem, childorder)
 
     parent_prefix = parent.tag.partition(':')[0] if ':' in parent.tag else ''
     for (tag, child) in items:
@@ -236,7 +339,7 @@ def _dict2xml_recurse(parent, dictitem, nsmap, current_prefixes,
                                       listchild,
                                       nsmap=nsmap_recurs,
                                       current_prefixes=prefixes_recurs,
-                                      childorder=childorder.get(reltag, {}),
+                                      childorder=childorder.child(reltag),
                                       force_prefix=force_prefix)
                 else:
                     elem.text = text_type(listchild)
@@ -270,7 +373,7 @@ def _dict2xml_recurse(parent, dictitem, nsmap, current_prefixes,
                                   child,
                                   nsmap=nsmap_recurs,
                                   current_prefixes=prefixes_recurs,
-                                  childorder=childorder.get(reltag, {}),
+                                  childorder=childorder.child(reltag),
                                   force_prefix=force_prefix)
             else:
                 elem.text = text_type(child)
@@ -300,6 +403,8 @@ def _do_xmlns(elem, tag, prefixes, nsmap, set_default_ns=True):
 
 def dict2xml(xmldict, childorder, force_prefix=False):
     """convert a python dictionary into an XML tree"""
+    if not isinstance(childorder, ChildOrder):
+        childorder = ChildOrder(childorder)
     roottag = list(filter(lambda x: not x.startswith("_"), xmldict.keys()))[0]
     root = ElementTree.Element(roottag)
 
@@ -317,6 +422,185 @@ def dict2xml(xmldict, childorder, force_prefix=False):
     return root
 
 
+class _Unsupported(Exception):
+    """
+    The document uses something only the ElementTree based serializer
+    handles (e.g. "{uri}name" tags, which make it invent prefixes)
+    """
+
+
+class _Scope(object):
+    """
+    Namespaces in effect for the content of an element: its namespace map
+    overrides and the prefix it declared, chained to the parent scope
+    instead of copying the whole map and prefix set for every element
+    """
+    __slots__ = ('parent', 'nsmap', 'prefix')
+
+    def __init__(self, parent, nsmap=None, prefix=None):
+        self.parent = parent
+        self.nsmap = nsmap
+        self.prefix = prefix
+
+    def get(self, prefix):
+        scope = self
+        while scope is not None:
+            if scope.nsmap and prefix in scope.nsmap:
+                return scope.nsmap[prefix]
+            scope = scope.parent
+        return None
+
+    def declared(self, prefix):
+        scope = self
+        while scope is not None:
+            if scope.prefix == prefix:
+                return True
+            scope = scope.parent
+        return False
+
+
+def _scope_xmlns(tag, scope, set_default_ns):
+    """
+    Same as `_do_xmlns`, returning the declarations instead of setting them
+    """
+    if tag[:1] == '{' or tag.count(':') > 1:
+        raise _Unsupported(tag)
+    prefix = tag.partition(':')[0] if ':' in tag else ''
+    if scope.declared(prefix):
+        return prefix, None, ()
+    uri = scope.get(prefix)
+    if not uri:
+        return prefix, uri, ()
+    if prefix:
+        if set_default_ns:
+            return prefix, uri, (('xmlns:%s' % prefix, uri), ('xmlns', uri))
+        return prefix, uri, (('xmlns:%s' % prefix, uri),)
+    if set_default_ns:
+        return prefix, uri, (('xmlns', uri),)
+    return prefix, uri, ()
+
+
+# ElementTree sorted attributes before Python 3.8
+_SORT_ATTRIBUTES = sys.version_info < (3, 8)
+# pylint: disable=protected-access
+_escape_cdata = ElementTree._escape_cdata
+_escape_attrib = ElementTree._escape_attrib
+# pylint: enable=protected-access
+
+
+def _write_element(write, tag, value, scope, childorder, level, force_prefix, pretty, decls):
+    """
+    :param scope: the `_Scope` of the element's content
+    :param decls: the xmlns attributes of the element
+    :returns: whether the element has children
+    """
+    # first pass: collect the attributes and children, which are needed
+    # before anything of the element can be written
+    attrs = dict(decls)
+    text = None
+    children = []
+    if isinstance(value, dict):
+        parent_prefix = tag.partition(':')[0] if ':' in tag else ''
+        for (key, child) in _sorted_items(value, childorder):
+            if key in ('_order', '_nsmap') or child is None:
+                continue
+            if key == '_text':
+                text = text_type(child)
+            elif key.startswith('@'):
+                attrname = key[1:]
+                attrs.update(_scope_xmlns(attrname, scope, False)[2])
+                attrs[attrname] = text_type(child)
+            elif type(child) in (list, tuple):
+                for listchild in child:
+                    child_scope, child_decls = scope, ()
+                    if ':' in key:
+                        prefix, uri, child_decls = _scope_xmlns(key, scope, not force_prefix)
+                        if uri:
+                            child_scope = _Scope(scope, None if force_prefix else {'': uri},
+                                                 prefix)
+                    elif force_prefix and parent_prefix:
+                        # take parent's prefix (for the next items as well)
+                        key = '%s:%s' % (parent_prefix, key)
+                    children.append((key, listchild, child_scope, child_decls, parent_prefix))
+            else:
+                child_scope, child_decls = scope, ()
+                if ':' in key:
+                    if isinstance(child, dict) and '_nsmap' in child:
+                        child_scope = _Scope(scope, child['_nsmap'])
+                    prefix, uri, child_decls = _scope_xmlns(key, child_scope, not force_prefix)
+                    if uri:
+                        child_scope = _Scope(child_scope, None if force_prefix else {'': uri},
+                                             prefix)
+                elif force_prefix and parent_prefix:
+                    # take parent's prefix
+                    key = '%s:%s' % (parent_prefix, key)
+                children.append((key, child, child_scope, child_decls, parent_prefix))
+    else:
+        text = text_type(value)
+
+    write('<' + tag)
+    items = sorted(attrs.items()) if _SORT_ATTRIBUTES else attrs.items()
+    for name, val in items:
+        write(' %s="%s"' % (name, _escape_attrib(val)))
+    if not text and not children:
+        write(' />')
+        return False
+    write('>')
+    if children and pretty and (not text or not text.strip()):
+        text = '\n' + (level + 1) * '  '
+    if text:
+        write(_escape_cdata(text))
+    last = len(children) - 1
+    for idx, (key, child, child_scope, child_decls, parent_prefix) in enumerate(children):
+        child_order = _NO_ORDER
+        if isinstance(child, dict):
+            tag_prefix = key.partition(':')[0] if ':' in key else ''
+            child_order = childorder.child(
+                key.rpartition(':')[2] if not tag_prefix or tag_prefix == parent_prefix else key)
+        _write_element(write, key, child, child_scope, child_order, level + 1,
+                       force_prefix, pretty, child_decls)
+        if pretty:
+            write('\n' + (level + (idx != last)) * '  ')
+    write('</' + tag + '>')
+    return bool(children)
+
+
+def dict2bytes(xmldict, childorder, force_prefix=False, pretty=True):
+    """
+    Serialize a python dictionary without building an XML tree.
+
+    With ``pretty``, the result is the same as ``ElementTree.tostring`` of
+    the ``indent``-ed tree from ``dict2xml`` (us-ascii, with character
+    references). Otherwise it is compact UTF-8, without indentation.
+    """
+    if not isinstance(childorder, ChildOrder):
+        childorder = ChildOrder(childorder)
+    parts = []
+    try:
+        roottag = list(filter(lambda x: not x.startswith("_"), xmldict.keys()))[0]
+        value = xmldict[roottag]
+        if not isinstance(value, dict):
+            raise _Unsupported(roottag)
+        nsmap = getattr(xmldict, '_nsmap', {})
+        scope = _Scope(None, nsmap)
+        decls = ()
+        if nsmap:
+            prefix, uri, decls = _scope_xmlns(roottag, scope, True)
+            if uri:
+                scope.prefix = prefix
+        if _write_element(parts.append, roottag, value, scope, childorder, 0,
+                          force_prefix, pretty, decls) and pretty:
+            parts.append('\n')
+    except _Unsupported:
+        el = dict2xml(xmldict, childorder, force_prefix=force_prefix)
+        if pretty:
+            indent(el)
+        return ElementTree.tostring(el)
+    if pretty:
+        return ''.join(parts).encode('us-ascii', 'xmlcharrefreplace')
+    return ''.join(parts).encode('utf-8')
+
+
 def _compute_prefix(tag, nsmap_r={}, default_prefix=None):
     if tag.startswith("{"):
         enduri = tag.index("}")
@@ -347,51 +631,269 @@ def get_prefixed_name(nsmap_r, name):
         return name
 
 
-def _xml2dict_recurse(node, nodedict, dictclass, nsmap, nsmap_r,
-                      default_prefix=None, parent_path=None, multi_nodes=None):
-    parent_path = parent_path or tuple()
-    if len(node.items()) > 0:
+# attributes dropped by ``xml2dict(strip_hints=True)``
+HINT_ATTRIBUTES = frozenset(['@xsi:schemaLocation'])
+
+
+class _PathNode(object):
+    """
+    Node of the trie compiled by `_compile_paths`, walked alongside the
+    element tree so that no path tuples are built while parsing
+    """
+    # pylint: disable=too-few-public-methods
+    __slots__ = ('path', 'children', 'multi', 'normalize', 'deferred')
+
+    def __init__(self, path):
+        self.path = path
+        self.children = {}
+        self.multi = False
+        self.normalize = None
+        self.deferred = False
+
+    def add(self, path):
+        node = self
+        for tag in path:
+            child = node.children.get(tag)
+            if child is None:
+                child = node.children[tag] = _PathNode(node.path + (tag,))
+            node = child
+        return node
+
+    def find(self, path):
+        node = self
+        for tag in path:
+            node = node.children.get(tag) if node is not None else None
+        return node
+
+
+_PATH_TRIES = {}
+
+
+def _compile_paths(multi_nodes, normalizers, deferred_paths):
+    """
+    Return the trie of the multi-node, normalizer and deferred element
+    paths (``None`` if there are none). Tries are shared and must not be
+    modified.
+    """
+    key = (frozenset(multi_nodes or ()), frozenset(iteritems(normalizers or {})),
+           frozenset(deferred_paths or ()))
+    try:
+        return _PATH_TRIES[key]
+    except KeyError:
+        pass
+    trie = None
+    if any(key):
+        trie = _PathNode(())
+        for path in key[0]:
+            trie.add(path).multi = True
+        for path, normalize in key[1]:
+            trie.add(path).normalize = normalize
+        for path in key[2]:
+            trie.add(path).deferred = True
+    if len(_PATH_TRIES) < 256:
+        _PATH_TRIES[key] = trie
+    return trie
+
+
+def _intern(name):
+    try:
+        return intern(name)
+    except TypeError:
+        # unicode names on Python 2
+        return name
+
+
+class _TagCache(object):
+    """
+    Interned dict keys of the element and attribute names seen with one
+    reverse nsmap
+    """
+    # pylint: disable=too-few-public-methods
+    __slots__ = ('nsmap_r', 'tags', 'attributes')
+
+    # bounds the caches when a peer sends ever new names
+    MAX_SIZE = 4096
+
+    def __init__(self, nsmap_r):
+        self.nsmap_r = nsmap_r
+        self.tags = {}  # (tag, default prefix) -> (dict key, default prefix of the children)
+        self.attributes = {}  # attribute name -> '@' dict key
+
+    def tag(self, tag, default_prefix):
+        key = (tag, default_prefix)
+        cached = self.tags.get(key)
+        if cached is None:
+            name, prefix = _compute_prefix(tag, self.nsmap_r, default_prefix)
+            cached = (_intern(name), prefix)
+            if len(self.tags) < self.MAX_SIZE:
+                self.tags[key] = cached
+        return cached
+
+    def attribute(self, name):
+        cached = self.attributes.get(name)
+        if cached is None:
+            cached = _intern("@%s" % get_prefixed_name(self.nsmap_r, name))
+            if len(self.attributes) < self.MAX_SIZE:
+                self.attributes[name] = cached
+        return cached
+
+
+_TAG_CACHES = {}
+
+
+def _tag_cache(nsmap_r):
+    # keyed by identity: maps from `reverse_nsmap` are shared, and the cache
+    # keeps its map alive so that the id is not reused. Past the limit (as
+    # for the nsmaps themselves) each call gets a cache of its own.
+    cache = _TAG_CACHES.get(id(nsmap_r))
+    if cache is None:
+        cache = _TagCache(nsmap_r)
+        if len(_TAG_CACHES) < 256:
+            _TAG_CACHES[id(nsmap_r)] = cache
+    return cache
+
+
+class _ParseContext(object):
+    """
+    What stays the same for all the elements of one ``xml2dict`` call
+    """
+    # pylint: disable=too-few-public-methods,too-many-arguments
+    __slots__ = ('newnode', 'nsmap', 'tags', 'multi_nodes', 'strip_hints', 'trie',
+                 'deferred')
+
+    def __init__(self, newnode, nsmap, tags, multi_nodes, strip_hints, trie, deferred):
+        self.newnode = newnode
+        self.nsmap = nsmap
+        self.tags = tags
+        self.multi_nodes = multi_nodes
+        self.strip_hints = strip_hints
+        self.trie = trie
+        self.deferred = deferred
+
+
+class Deferred(object):
+    """
+    Elements left unparsed by ``xml2dict(deferred=...)``: those at one of
+    ``paths`` are kept as elements, and only converted and added to their
+    parent dict by ``build``.
+    """
+
+    def __init__(self, paths):
+        self.paths = frozenset(paths)
+        self._context = None
+        self._lock = threading.Lock()
+        self._pending = {}  # tag -> [(parent dict, element, default prefix, path)]
+
+    def add(self, context, tag, entry):
+        self._context = context
+        self._pending.setdefault(tag, []).append(entry)
+
+    def set_normalizers(self, normalizers):
+        """
+        Replace the ``normalizers`` applied to the elements still to build
+        """
+        ctx = self._context
+        if ctx is not None:
+            ctx.trie = _compile_paths(ctx.multi_nodes, normalizers, self.paths)
+
+    def pending(self, tag=None):
+        """
+        Whether elements (tagged ``tag``, if given) are still to be built
+        """
+        return tag in self._pending if tag is not None else bool(self._pending)
+
+    def build(self, tag=None):
+        """
+        Build the deferred elements tagged ``tag``, or all of them. Elements
+        already built (or never deferred) are skipped, so this is safe to
+        call from several threads.
+        """
+        ctx = self._context
+        with self._lock:
+            if tag is None:
+                tags = list(self._pending)
+            elif tag in self._pending:
+                tags = [tag]
+            else:
+                return
+            for atag in tags:
+                for parent, element, prefix, path in self._pending.pop(atag):
+                    _add_child(parent, element, atag, prefix, ctx.trie.find(path), ctx,
+                               reserved=True)
+
+
+def _add_child(nodedict, child, childtag, childprefix, pathnode, ctx, reserved=False):
+    # print "recursing with", childtag, "[", childprefix, "] default=", default_prefix
+    # recursively add the element's children
+    newitem = _xml2dict_recurse(child, ctx.newnode(), ctx, childprefix, pathnode)
+    if pathnode is not None and pathnode.normalize is not None:
+        newitem = pathnode.normalize(newitem)
+
+    nodeval = nodedict.get(childtag)
+    if nodeval is not None:
+        # found duplicate tag, force a list
+        if isinstance(nodeval, list):
+            # append to existing list
+            nodeval.append(newitem)
+        else:
+            # convert to list
+            nodedict[childtag] = [nodeval, newitem]
+    else:
+        if not ctx.strip_hints and not reserved:
+            nodedict.setdefault('_order', []).append(childtag)
+        if pathnode is not None and pathnode.multi:
+            # if this node is configured to appear multiple times, put it in a
+            # list
+            nodedict[childtag] = [newitem]
+        else:
+            # only one, directly set the dictionary
+            nodedict[childtag] = newitem
+
+
+def _xml2dict_recurse(node, nodedict, ctx, default_prefix, pathnode):
+    """
+    ``pathnode`` is the node of ``ctx.trie`` for ``node``, ``None`` off the
+    paths of the trie
+    """
+    tags = ctx.tags
+    attributes = node.items()
+    if len(attributes) > 0:
         # if we have attributes, set them
         # wil/rem nodedict.update(dict(node.items()))
-        nodedict.update(dict(("@%s" % get_prefixed_name(nsmap_r, k), v)
-                             for k, v in node.items()))
+        attribute = tags.attribute
+        if ctx.strip_hints:
+            nodedict.update((key, v) for key, v in ((attribute(k), v) for k, v in attributes)
+                            if key not in HINT_ATTRIBUTES)
+        else:
+            nodedict.update((attribute(k), v) for k, v in attributes)
+        # stays a dict even if all its attributes were hints, like it would
+        # after stripping them from the full tree
+        is_dict = True
+    else:
+        is_dict = False
 
+    children = pathnode.children if pathnode is not None else None
     for child in node:
-        childtag, childprefix = _compute_prefix(child.tag, nsmap_r, default_prefix)
-
-        # print "recursing with", childtag, "[", childprefix, "] default=", default_prefix
-        # recursively add the element's children
-        newitem = _xml2dict_recurse(child, dictclass(), dictclass, nsmap, nsmap_r,
-                                    default_prefix=childprefix,
-                                    multi_nodes=multi_nodes,
-                                    parent_path=parent_path + (childtag,))
-
-        nodeval = nodedict.get(childtag)
-        if nodeval is not None:
-            # found duplicate tag, force a list
-            if isinstance(nodeval, list):
-                # append to existing list
-                nodeval.append(newitem)
-            else:
-                # convert to list
-                nodedict[childtag] = [nodeval, newitem]
+        childtag, childprefix = tags.tag(child.tag, default_prefix)
+        childnode = children.get(childtag) if children else None
+        if childnode is not None and childnode.deferred:
+            if not ctx.strip_hints:
+                # keep the document order: the child is added to the dict
+                # later, but takes its place in _order now
+                order = nodedict.setdefault('_order', [])
+                if childtag not in order:
+                    order.append(childtag)
+            ctx.deferred.add(ctx, childtag, (nodedict, child, childprefix, childnode.path))
+            is_dict = True
         else:
-            nodedict.setdefault('_order', []).append(childtag)
-            nodepath = parent_path + (childtag,)
-            if multi_nodes and nodepath in multi_nodes:
-                # if this node is configured to appear multiple times, put it in a
-                # list
-                nodedict[childtag] = [newitem]
-            else:
-                # only one, directly set the dictionary
-                nodedict[childtag] = newitem
+            _add_child(nodedict, child, childtag, childprefix, childnode, ctx)
 
     if node.text is None:
         text = ''
     else:
         text = node.text.strip()
 
-    if len(nodedict) > 0:
+    if len(nodedict) > 0 or is_dict:
         # if we have a dictionary add the text as a dictionary value
         # (if there is any)
         if len(text) > 0:
@@ -404,21 +906,40 @@ def _xml2dict_recurse(node, nodedict, dictclass, nsmap, nsmap_r,
     return nodedict
 
 
-def xml2dict(root, dictclass=XmlDictObject, outerclass=XmlDictObject,
-             default_prefix=None, multi_nodes=None, extra_nsmap=None):
+def xml2dict(root, dictclass=None, outerclass=XmlDictObject,
+             default_prefix=None, multi_nodes=None, extra_nsmap=None,
+             strip_hints=False, normalizers=None, deferred=None):
     """convert an xml tree into a python dictionary
+
+    :param dictclass: class of the dicts built for elements, `XmlNode`
+                      (sharing the nsmap of the document) by default
+    :param strip_hints: leave out the ``_order`` lists and the
+                        `HINT_ATTRIBUTES`, as ``EppClient.strip_hints`` would
+    :param normalizers: maps element paths (like `multi_nodes`) to functions
+                        applied to the value of each element at that path
+                        before it is added to its parent
+    :param deferred: a `Deferred` collecting the elements not to convert yet
     """
-    rootnode = dictclass()
     # we cheat a bit, instantiate it to get the nsmap and nsmap_r
 
     outer = outerclass(extra_nsmap=extra_nsmap)
     nsmap = outer._nsmap
     nsmap_r = outer._nsmap_r
 
-    tag, default_prefix = _compute_prefix(root.tag, nsmap_r, default_prefix)
-    outer[tag] = _xml2dict_recurse(root, rootnode, dictclass, nsmap=nsmap, nsmap_r=nsmap_r,
-                                   default_prefix=default_prefix, parent_path=(tag,),
-                                   multi_nodes=multi_nodes)
+    if dictclass is None or issubclass(dictclass, XmlNode):
+        nodeclass = dictclass or XmlNode
+
+        def newnode():
+            return nodeclass(None, nsmap)
+    else:
+        newnode = dictclass
+    trie = _compile_paths(multi_nodes, normalizers, deferred.paths if deferred else None)
+    ctx = _ParseContext(newnode, nsmap, _tag_cache(nsmap_r), multi_nodes, strip_hints, trie,
+                        deferred)
+
+    tag, default_prefix = ctx.tags.tag(root.tag, default_prefix)
+    rootnode = trie.children.get(tag) if trie is not None else None
+    outer[tag] = _xml2dict_recurse(root, newnode(), ctx, default_prefix, rootnode)
     return outer
 
 
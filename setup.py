@@ -1,11 +1,8 @@
-import sys
 from setuptools import setup, find_packages
 
 from eppy import __version__
 
 install_requires = ['six', 'future']
-if sys.version_info < (3,2):
-    install_requires.append('backports.ssl_match_hostname')
 
 setup(
     name = "EPP",
@@ -15,5 +12,6 @@ setup(
     description = "EPP Client for Python",
     license = "MIT/X",
     install_requires = install_requires,
+    extras_require = {'lxml': ['lxml']},
     packages = ['eppy']
 )
@@ -0,0 +1,145 @@
+"""
+A minimal EPP server on localhost: it answers every command with a 1000
+result echoing the clTRID, a <chkData> for domain checks and an <infData>
+for domain infos
+"""
+
+import re
+import socket
+import struct
+import threading
+
+import pytest
+
+
+GREETING = (b'<?xml version="1.0" encoding="UTF-8"?>'
+            b'<epp xmlns="urn:ietf:params:xml:ns:epp-1.0"><greeting>'
+            b'<svID>fake</svID><svDate>2020-01-01T00:00:00Z</svDate></greeting></epp>')
+
+RESPONSE = '''<?xml version="1.0" encoding="UTF-8"?>
+<epp xmlns="urn:ietf:params:xml:ns:epp-1.0">
+  <response>
+    <result code="%(code)s"><msg>Command completed successfully</msg></result>
+    %(resdata)s
+    <trID>%(cltrid)s<svTRID>SV-%(n)d</svTRID></trID>
+  </response>
+</epp>'''
+
+CHK_DATA = ('<resData><domain:chkData xmlns:domain="urn:ietf:params:xml:ns:domain-1.0">'
+            '%s</domain:chkData></resData>')
+
+INF_DATA = ('<resData><domain:infData xmlns:domain="urn:ietf:params:xml:ns:domain-1.0">'
+            '<domain:name>%s</domain:name><domain:roid>R1</domain:roid>'
+            '<domain:status s="ok"/><domain:registrant>reg1</domain:registrant>'
+            '<domain:contact type="admin">adm</domain:contact>'
+            '<domain:ns><domain:hostObj>ns1.example.net</domain:hostObj></domain:ns>'
+            '<domain:clID>me</domain:clID><domain:crDate>2020-01-01T00:00:00Z</domain:crDate>'
+            '</domain:infData></resData>')
+
+
+def _recv_exactly(conn, size):
+    data = b''
+    while len(data) < size:
+        chunk = conn.recv(size - len(data))
+        if not chunk:
+            return None
+        data += chunk
+    return data
+
+
+def _frame(payload):
+    return struct.pack('>I', len(payload) + 4) + payload
+
+
+def respond(payload, count):
+    """
+    The response to the command ``payload``, the ``count``-th of its
+    connection
+    """
+    text = payload.decode('utf-8')
+    if '<hello' in text:
+        return GREETING
+    cltrid = re.search(r'<clTRID>([^<]*)</clTRID>', text)
+    resdata = ''
+    if '<check>' in text:
+        names = re.findall(r'<domain:name>([^<]*)</domain:name>', text)
+        resdata = CHK_DATA % ''.join(
+            '<domain:cd><domain:name avail="1">%s</domain:name></domain:cd>' % name
+            for name in names)
+    elif '<info>' in text:
+        name = re.search(r'<domain:name>([^<]*)</domain:name>', text)
+        resdata = INF_DATA % name.group(1)
+    code = '1500' if '<logout' in text else '1000'
+    return (RESPONSE % dict(
+        code=code, resdata=resdata, n=count,
+        cltrid='<clTRID>%s</clTRID>' % cltrid.group(1) if cltrid else '')).encode('utf-8')
+
+
+class FakeServer(object):
+    """
+    Serve each connection in a thread. ``received`` holds the payloads of
+    all commands, ``responder(payload, count)`` makes the response (or a
+    list of responses to send at once, or None to drop the connection).
+    """
+
+    def __init__(self, responder=respond):
+        self.responder = responder
+        self.received = []
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind(('127.0.0.1', 0))
+        self.sock.listen(8)
+        self.port = self.sock.getsockname()[1]
+        thread = threading.Thread(target=self._accept)
+        thread.daemon = True
+        thread.start()
+
+    def _accept(self):
+        while True:
+            try:
+                conn, _ = self.sock.accept()
+            except (OSError, socket.error):
+                return
+            thread = threading.Thread(target=self._serve, args=(conn,))
+            thread.daemon = True
+            thread.start()
+
+    def _serve(self, conn):
+        conn.sendall(_frame(GREETING))
+        count = 0
+        while True:
+            header = _recv_exactly(conn, 4)
+            if header is None:
+                break
+            payload = _recv_exactly(conn, struct.unpack('>I', header)[0] - 4)
+            if payload is None:
+                break
+            count += 1
+            self.received.append(payload)
+            response = self.responder(payload, count)
+            if response is None:
+                break
+            if isinstance(response, bytes):
+                response = [response]
+            conn.sendall(b''.join(_frame(resp) for resp in response))
+        conn.close()
+
+    def close(self):
+        self.sock.close()
+
+
+@pytest.fixture
+def server():
+    srv = FakeServer()
+    yield srv
+    srv.close()
+
+
+@pytest.fixture
+def client(server):
+    from eppy.client import EppClient
+    cli = EppClient(host='127.0.0.1', port=server.port, ssl_enable=False, socket_timeout=5)
+    cli.connect()
+    yield cli
+    if cli.sock is not None:
+        cli.close()
@@ -0,0 +1,235 @@
+import asyncio
+import pickle
+
+import pytest
+
+from eppy.client import EppClient
+from eppy.mux import EppMultiplexer
+from eppy.doc import EppInfoDomainCommand, EppResponse
+from eppy.records import DomainInfo
+
+from conftest import FakeServer, respond
+
+
+def _info(name, cltrid='ABC-1'):
+    cmd = EppInfoDomainCommand()
+    cmd.name = name
+    cmd['epp']['command']['clTRID'] = cltrid
+    return cmd
+
+
+def test_send_round_trip(server, client):
+    assert client.greeting['epp']['greeting']['svID'] == 'fake'
+    resp = client.login('me', 'secret')
+    assert resp.ok
+    cmd = _info('example.com')
+    resp = client.send(cmd)
+    assert isinstance(resp, EppResponse)
+    assert resp.code == '1000'
+    assert resp.cltrid == 'ABC-1'
+    assert resp.resData['domain:infData']['name'] == 'example.com'
+    assert b'<domain:name>example.com</domain:name>' in server.received[-1]
+    assert client.logout().code == '1500'
+
+
+def test_send_records(client):
+    resp = client.send_records(_info('example.com'))
+    assert resp.ok
+    assert isinstance(resp.records, DomainInfo)
+    assert resp.records.name == 'example.com'
+    assert resp.records.ns == ('ns1.example.net',)
+
+
+def test_lazy_response_matches_eager(client):
+    eager = client.send(_info('example.com'), strip_hints=False)
+    client.lazy_responses = True
+    lazy = client.send(_info('example.com'), strip_hints=False)
+    assert '_deferred' in lazy.__dict__
+    assert lazy.resData['domain:infData']['name'] == 'example.com'
+    lazy.materialize()
+    assert lazy['epp']['response']['_order'] == eager['epp']['response']['_order']
+    # only the server transaction ids differ
+    assert lazy.to_xml(force_prefix=False).replace(b'SV-2', b'SV-1') == \
+        eager.to_xml(force_prefix=False)
+
+
+def test_lazy_response_pickles(client):
+    client.lazy_responses = True
+    resp = client.send(_info('example.com'))
+    copy = pickle.loads(pickle.dumps(resp))
+    assert '_deferred' not in copy.__dict__
+    assert copy.resData['domain:infData']['name'] == 'example.com'
+    assert copy.unwrap() == resp.unwrap()
+
+
+def test_stream_parse_error_keeps_connection_usable():
+    def responder(payload, count):
+        if b'broken.example' in payload:
+            # not well-formed early on, and larger than the read buffer
+            return b'<epp><response></result>' + b' ' * 100000 + b'</response></epp>'
+        return respond(payload, count)
+
+    server = FakeServer(responder)
+    client = EppClient(host='127.0.0.1', port=server.port, ssl_enable=False,
+                       socket_timeout=5, read_bufsize=1024, stream_parse=True)
+    try:
+        client.connect()
+        with pytest.raises(SyntaxError):
+            client.send(_info('broken.example'))
+        resp = client.send(_info('example.com'))
+        assert resp.resData['domain:infData']['name'] == 'example.com'
+        client.close()
+    finally:
+        server.close()
+
+
+class CountingInfoCommand(EppInfoDomainCommand):
+    calls = []
+
+    _response_normalizers = {
+        ('epp', 'response', 'resData', 'domain:infData', 'name'):
+            lambda value: CountingInfoCommand.calls.append(value) or value.upper(),
+    }
+
+
+@pytest.mark.parametrize('stream_parse', [False, True])
+def test_normalizers_applied_once(client, stream_parse):
+    client.stream_parse = stream_parse
+    del CountingInfoCommand.calls[:]
+    cmd = CountingInfoCommand()
+    cmd.name = 'example.com'
+    cmd['epp']['command']['clTRID'] = 'ABC-1'
+    resp = client.send(cmd)
+    assert CountingInfoCommand.calls == ['example.com']
+    assert resp.resData['domain:infData']['name'] == 'EXAMPLE.COM'
+
+
+@pytest.mark.parametrize('validate_cert,validate_hostname', [
+    (True, True), (True, False), (False, False)])
+def test_ssl_context(validate_cert, validate_hostname):
+    import ssl
+    import warnings
+    from eppy.client import DEFAULT_SSL_PROTOCOL, get_ssl_context
+    with warnings.catch_warnings():
+        warnings.simplefilter('error', DeprecationWarning)
+        ctx = get_ssl_context(validate_cert=validate_cert, validate_hostname=validate_hostname)
+    assert ctx.protocol == DEFAULT_SSL_PROTOCOL
+    if hasattr(ssl, 'PROTOCOL_TLS_CLIENT'):
+        assert DEFAULT_SSL_PROTOCOL == ssl.PROTOCOL_TLS_CLIENT
+    assert ctx.verify_mode == (ssl.CERT_REQUIRED if validate_cert else ssl.CERT_NONE)
+    assert ctx.check_hostname == validate_hostname
+    assert get_ssl_context(validate_cert=validate_cert,
+                           validate_hostname=validate_hostname) is ctx
+
+
+def _malformed_for_broken(payload, count):
+    if b'broken.example' in payload:
+        return b'<epp><response></result></response></epp>'
+    return respond(payload, count)
+
+
+@pytest.mark.parametrize('stream_parse', [False, True])
+def test_windowsend_malformed_response(stream_parse):
+    server = FakeServer(_malformed_for_broken)
+    client = EppClient(host='127.0.0.1', port=server.port, ssl_enable=False,
+                       socket_timeout=5, stream_parse=stream_parse)
+    try:
+        client.connect()
+        names = ['a.example', 'broken.example', 'c.example']
+        results = client.windowsend([_info(name, 'ABC-%d' % idx)
+                                     for idx, name in enumerate(names)], window=3)
+        assert results[0].response.resData['domain:infData']['name'] == 'a.example'
+        assert results[1].response is None
+        assert isinstance(results[1].error, SyntaxError)
+        assert results[1].latency is not None
+        assert results[2].response.resData['domain:infData']['name'] == 'c.example'
+        # nothing left unread on the connection
+        resp = client.send(_info('d.example'))
+        assert resp.resData['domain:infData']['name'] == 'd.example'
+        client.close()
+    finally:
+        server.close()
+
+
+def test_mux_malformed_response():
+    server = FakeServer(_malformed_for_broken)
+    mux = EppMultiplexer()
+    mux.add_endpoint('fake', EppClient(host='127.0.0.1', port=server.port, ssl_enable=False,
+                                       socket_timeout=5))
+    mux.start()
+    try:
+        names = ['a.example', 'broken.example', 'c.example']
+        futures = [mux.submit(_info(name, 'ABC-%d' % idx), 'fake')
+                   for idx, name in enumerate(names)]
+        assert futures[0].result(5).resData['domain:infData']['name'] == 'a.example'
+        assert isinstance(futures[1].exception(5), SyntaxError)
+        assert futures[2].result(5).resData['domain:infData']['name'] == 'c.example'
+        # the session survives
+        assert 'fake' in mux.endpoints
+        resp = mux.submit(_info('d.example', 'ABC-3'), 'fake').result(5)
+        assert resp.resData['domain:infData']['name'] == 'd.example'
+    finally:
+        mux.close(logout=False)
+        server.close()
+
+
+class HookedInfoCommand(CountingInfoCommand):
+    hooked = []
+
+    def normalize_response(self, respdoc):
+        super(HookedInfoCommand, self).normalize_response(respdoc)
+        self.hooked.append(respdoc.resData['domain:infData']['name'])
+
+
+@pytest.mark.parametrize('stream_parse', [False, True])
+def test_normalize_response_override(client, stream_parse):
+    client.stream_parse = stream_parse
+    del CountingInfoCommand.calls[:]
+    del HookedInfoCommand.hooked[:]
+    cmd = HookedInfoCommand()
+    cmd.name = 'example.com'
+    cmd['epp']['command']['clTRID'] = 'ABC-1'
+    resp = client.send(cmd)
+    assert HookedInfoCommand.hooked == ['EXAMPLE.COM']
+    # the normalizers still run once, even though the override calls the base method
+    assert CountingInfoCommand.calls == ['example.com']
+    assert resp.resData['domain:infData']['name'] == 'EXAMPLE.COM'
+
+
+def test_normalize_response_override_mux(server):
+    del HookedInfoCommand.hooked[:]
+    mux = EppMultiplexer()
+    mux.add_endpoint('fake', EppClient(host='127.0.0.1', port=server.port, ssl_enable=False,
+                                       socket_timeout=5))
+    mux.start()
+    try:
+        cmd = HookedInfoCommand()
+        cmd.name = 'example.com'
+        resp = mux.submit(cmd, 'fake').result(5)
+        assert HookedInfoCommand.hooked == ['EXAMPLE.COM']
+        assert resp.resData['domain:infData']['name'] == 'EXAMPLE.COM'
+    finally:
+        mux.close(logout=False)
+
+
+def test_normalize_response_override_async(server):
+    from eppy.aioclient import AsyncEppClient
+
+    async def run():
+        client = AsyncEppClient(host='127.0.0.1', port=server.port, ssl_enable=False)
+        await client.connect()
+        try:
+            cmd = HookedInfoCommand()
+            cmd.name = 'example.com'
+            return await client.send(cmd)
+        finally:
+            await client.close()
+
+    del HookedInfoCommand.hooked[:]
+    loop = asyncio.new_event_loop()
+    try:
+        resp = loop.run_until_complete(run())
+    finally:
+        loop.close()
+    assert HookedInfoCommand.hooked == ['EXAMPLE.COM']
+    assert resp.resData['domain:infData']['name'] == 'EXAMPLE.COM'
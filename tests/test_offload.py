@@ -0,0 +1,46 @@
+import pytest
+
+from eppy.client import EppClient
+from eppy.doc import EppInfoDomainCommand, EppResponse
+from eppy.offload import ProcessCodec
+
+
+@pytest.fixture(scope='module')
+def codec():
+    codec = ProcessCodec(max_workers=1)
+    yield codec
+    codec.shutdown()
+
+
+def _info(name):
+    cmd = EppInfoDomainCommand()
+    cmd.name = name
+    cmd['epp']['command']['clTRID'] = 'ABC-1'
+    return cmd
+
+
+@pytest.mark.parametrize('pretty', [True, False])
+def test_serialize(codec, pretty):
+    cmd = _info('example.com')
+    assert codec.serialize(cmd, pretty=pretty) == cmd.to_xml(force_prefix=True, pretty=pretty)
+
+
+def test_send_through_codec(server, codec):
+    client = EppClient(host='127.0.0.1', port=server.port, ssl_enable=False, socket_timeout=5,
+                       codec=codec, pretty_xml=False)
+    client.connect()
+    try:
+        resp = client.send(_info('example.com'))
+        assert server.received[-1] == _info('example.com').to_xml(force_prefix=True, pretty=False)
+        client.codec = None
+        expected = client.send(_info('example.com'))
+    finally:
+        client.close()
+    assert isinstance(resp, EppResponse)
+    # only the server transaction ids differ
+    assert resp.to_xml(force_prefix=False).replace(b'SV-1', b'SV-2') == \
+        expected.to_xml(force_prefix=False)
+    assert resp.resData['domain:infData']['name'] == 'example.com'
+    # the nodes share the namespace map of the response
+    # pylint: disable=protected-access
+    assert resp['epp']['response']['resData']._nsmap is resp._nsmap
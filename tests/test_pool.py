@@ -0,0 +1,41 @@
+import socket
+
+import pytest
+
+from eppy.client import EppClient
+from eppy.pool import EppClientPool
+
+
+def test_size_is_clamped_to_max_sessions(server):
+    pool = EppClientPool('127.0.0.1', 'me', 'secret', port=server.port, size=10,
+                         max_sessions=5, ssl_enable=False, socket_timeout=5)
+    assert pool.max_sessions == 5
+    assert pool.size == 5
+    try:
+        assert pool.prewarm() == 5
+        assert pool.num_sessions == 5
+        assert pool.prewarm(10) == 0
+    finally:
+        pool.close()
+
+
+def test_failed_connect_closes_socket():
+    # a port nobody listens on
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    clients = []
+
+    def factory(**kwargs):
+        clients.append(EppClient(**kwargs))
+        return clients[-1]
+
+    pool = EppClientPool('127.0.0.1', 'me', 'secret', port=port, client_factory=factory,
+                         ssl_enable=False, socket_timeout=5)
+    with pytest.raises((IOError, OSError)):
+        with pool.session():
+            pass
+    assert len(clients) == 1
+    assert clients[0].sock is None
+    assert pool.num_sessions == 0
@@ -0,0 +1,47 @@
+import threading
+
+from eppy.client import EppClient
+from eppy.doc import EppCheckDomainCommand
+from eppy.ratelimit import RateLimitedClient
+from eppy.utils import monotonic
+
+from conftest import FakeServer, respond
+
+
+def _check(name):
+    cmd = EppCheckDomainCommand()
+    cmd.name = [name]
+    return cmd
+
+
+def test_batchsend_is_paced():
+    arrivals = []
+    lock = threading.Lock()
+
+    def responder(payload, count):
+        if b'<check>' in payload:
+            with lock:
+                arrivals.append(monotonic())
+        return respond(payload, count)
+
+    server = FakeServer(responder)
+    rate, burst, count = 100.0, 3, 30
+    client = RateLimitedClient(
+        EppClient(host='127.0.0.1', port=server.port, ssl_enable=False, socket_timeout=5),
+        limits={'check': (rate, burst)})
+    try:
+        client.connect()
+        start = monotonic()
+        resps = client.batchsend([_check('%d.example' % idx) for idx in range(count)])
+        client.close()
+    finally:
+        server.close()
+    assert [resp.code for resp in resps] == ['1000'] * count
+    assert len(arrivals) == count
+    # never more than the burst ahead of the rate...
+    for idx, arrival in enumerate(arrivals):
+        assert arrival - start >= (idx + 1 - burst) / rate - 0.005
+    # ...and not all at the end
+    assert arrivals[count // 2] - start < (count - burst) / rate
+    assert client.stats['check'].count == count
+    assert client.stats['check'].queue_wait > 0
@@ -0,0 +1,93 @@
+import pytest
+
+from eppy.doc import EppCreateDomainCommand, EppTransferDomainCommand
+from eppy.exceptions import EppUnknownOutcomeError
+from eppy.resilient import ResilientEppClient
+
+from conftest import FakeServer, RESPONSE, respond
+
+
+TRN_DATA = ('<resData><domain:trnData xmlns:domain="urn:ietf:params:xml:ns:domain-1.0">'
+            '<domain:name>example.com</domain:name><domain:trStatus>%s</domain:trStatus>'
+            '<domain:reID>%s</domain:reID><domain:reDate>2020-01-01T00:00:00Z</domain:reDate>'
+            '<domain:acID>other</domain:acID><domain:acDate>2020-01-06T00:00:00Z</domain:acDate>'
+            '</domain:trnData></resData>')
+
+
+def _transfer_server(code, status=None, reid=None):
+    def responder(payload, count):
+        if b'op="query"' in payload:
+            resdata = TRN_DATA % (status, reid) if code == '1000' else ''
+            return (RESPONSE % dict(code=code, resdata=resdata, cltrid='', n=count)).encode()
+        return respond(payload, count)
+    return FakeServer(responder)
+
+
+@pytest.mark.parametrize('code,status,reid,applied', [
+    ('1000', 'pending', 'me', True),
+    ('1000', 'serverApproved', 'me', True),
+    ('1000', 'pending', 'other', False),
+    ('1000', 'clientApproved', 'other', False),
+    ('1000', 'clientRejected', 'me', None),
+    ('2301', None, None, False),
+    ('2400', None, None, None),
+])
+def test_resolve_transfer_request(code, status, reid, applied):
+    server = _transfer_server(code, status, reid)
+    client = ResilientEppClient(host='127.0.0.1', port=server.port, ssl_enable=False,
+                                socket_timeout=5)
+    try:
+        client.login('me', 'secret')
+        cmd = EppTransferDomainCommand('request')
+        cmd.name = 'example.com'
+        cmd.authInfo = {'pw': 'x'}
+        assert client.resolve(cmd) is applied
+        assert b'<domain:pw>x</domain:pw>' in server.received[-1]
+        client.close()
+    finally:
+        server.close()
+
+
+@pytest.mark.parametrize('cr_date,applied', [
+    # the greeting of the fake server is dated 2020-01-01T00:00:00Z
+    ('2020-01-01T00:00:30.0Z', True),
+    ('2020-01-01T01:00:30+01:00', True),
+    ('2019-12-31T23:59:59Z', False),
+    (None, None),
+])
+def test_resolve_create(cr_date, applied):
+    creates = []
+
+    def responder(payload, count):
+        if b'<create>' in payload:
+            creates.append(payload)
+            if len(creates) == 1:
+                # the session is lost before the response
+                return None
+            return (RESPONSE % dict(code='2302', resdata='', cltrid='', n=count)).encode()
+        resp = respond(payload, count)
+        if b'<info>' in payload:
+            crdate = b'<domain:crDate>2020-01-01T00:00:00Z</domain:crDate>'
+            resp = resp.replace(crdate, b'<domain:crDate>%s</domain:crDate>' % cr_date.encode()
+                                if cr_date else b'')
+        return resp
+
+    server = FakeServer(responder)
+    client = ResilientEppClient(host='127.0.0.1', port=server.port, ssl_enable=False,
+                                socket_timeout=5, reconnect_delay=0)
+    try:
+        client.connect()
+        client.login('me', 'secret')
+        cmd = EppCreateDomainCommand()
+        cmd.name = 'example.com'
+        if applied is None:
+            with pytest.raises(EppUnknownOutcomeError):
+                client.send(cmd)
+        else:
+            resp = client.send(cmd)
+            # replayed if it was not applied
+            assert resp.code == ('1000' if applied else '2302')
+            assert len(creates) == (1 if applied else 2)
+        client.close()
+    finally:
+        server.close()
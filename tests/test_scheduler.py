@@ -0,0 +1,33 @@
+from concurrent.futures import Future
+
+import pytest
+
+from eppy.doc import EppCheckDomainCommand
+from eppy.scheduler import PriorityScheduler
+
+
+def test_synchronous_failures_do_not_recurse():
+    # the first command stays in flight while the queue fills up; the
+    # backend then fails every command at once (e.g. a removed endpoint)
+    first = Future()
+    calls = []
+
+    def backend(doc):
+        calls.append(doc)
+        if len(calls) == 1:
+            return first
+        future = Future()
+        future.set_exception(KeyError('registry'))
+        return future
+
+    scheduler = PriorityScheduler(backend, max_inflight=1)
+    futures = [scheduler.submit(EppCheckDomainCommand()) for _ in range(5000)]
+    assert scheduler.num_queued == 4999
+    first.set_exception(KeyError('registry'))
+
+    assert len(calls) == 5000
+    for future in futures:
+        with pytest.raises(KeyError):
+            future.result(timeout=0)
+    assert scheduler.num_queued == 0
+    assert scheduler.num_inflight == 0
@@ -0,0 +1,85 @@
+import pytest
+
+from eppy.client import EppClient
+from eppy.doc import EppCheckDomainCommand, EppInfoDomainCommand, ensure_cltrid
+from eppy.mux import EppMultiplexer
+from eppy.template import Template, FilledCommand
+
+from conftest import FakeServer, respond
+
+
+INFO = Template(EppInfoDomainCommand, {'name': 'name', 'hosts': '@hosts'}, cltrid=True)
+CHECK = Template(EppCheckDomainCommand, {'names': 'name'}, multi=('names',))
+
+
+def _info(name, hosts, cltrid):
+    cmd = EppInfoDomainCommand()
+    cmd.name = name
+    cmd['epp']['command']['info']['domain:info']['@hosts'] = hosts
+    cmd['epp']['command']['clTRID'] = cltrid
+    return cmd
+
+
+@pytest.mark.parametrize('name', ['example.com', 'a&b<c>', u'\xe9xample.com', 0, '', None])
+@pytest.mark.parametrize('hosts', ['all', '"x"', '', None])
+def test_fill_matches_to_xml(name, hosts):
+    assert INFO.fill(name=name, hosts=hosts, clTRID='ABC-1') == \
+        _info(name, hosts, 'ABC-1').to_xml(force_prefix=True)
+
+
+@pytest.mark.parametrize('names', [['a.com'], ['a.com', 'b&c.com'], ['a.com', '', 'b.com']])
+def test_fill_multi_matches_to_xml(names):
+    cmd = EppCheckDomainCommand()
+    cmd.name = names
+    assert CHECK.fill(names=names) == cmd.to_xml(force_prefix=True)
+
+
+def test_filled_command_protocol():
+    cmd = INFO.command(name='example.com', hosts='all', clTRID='ABC-1')
+    assert isinstance(cmd, FilledCommand)
+    assert bytes(cmd) == cmd.to_xml() == cmd.xml
+    assert ensure_cltrid(cmd) == 'ABC-1'
+
+
+@pytest.mark.parametrize('pipeline', [False, True])
+def test_batchsend(server, client, pipeline):
+    cmds = [INFO.command(name='%d.example' % idx, hosts='all') for idx in range(3)]
+    resps = client.batchsend(cmds, pipeline=pipeline)
+    assert server.received[-3:] == [cmd.xml for cmd in cmds]
+    assert [resp.cltrid for resp in resps] == [cmd.clTRID for cmd in cmds]
+
+
+def _swap_pairs(payload, count):
+    # answer each odd command only after the next one, in reverse order
+    if count % 2:
+        _swap_pairs.held = respond(payload, count)
+        return []
+    return [respond(payload, count), _swap_pairs.held]
+
+
+def test_windowsend_matches_by_cltrid():
+    server = FakeServer(_swap_pairs)
+    client = EppClient(host='127.0.0.1', port=server.port, ssl_enable=False, socket_timeout=5)
+    try:
+        client.connect()
+        cmds = [INFO.command(name='%d.example' % idx, hosts='all') for idx in range(4)]
+        results = client.windowsend(cmds, window=2)
+        assert [res.response.resData['domain:infData']['name'] for res in results] == \
+            ['%d.example' % idx for idx in range(4)]
+        client.close()
+    finally:
+        server.close()
+
+
+def test_mux_submit(server):
+    mux = EppMultiplexer()
+    mux.add_endpoint('fake', EppClient(host='127.0.0.1', port=server.port, ssl_enable=False,
+                                       socket_timeout=5))
+    mux.start()
+    try:
+        cmd = INFO.command(name='example.com', hosts='all')
+        resp = mux.submit(cmd, 'fake').result(5)
+        assert resp.cltrid == cmd.clTRID
+        assert resp.resData['domain:infData']['name'] == 'example.com'
+    finally:
+        mux.close(logout=False)
@@ -0,0 +1,114 @@
+import re
+from contextlib import contextmanager
+
+import pytest
+from six import text_type
+
+from eppy import xmlbackend
+from eppy.doc import EppResponse
+from eppy.records import decode_response
+
+from conftest import GREETING, respond
+
+
+pytest.importorskip('lxml')
+
+CORPUS = [
+    GREETING,
+    respond(b'<info><domain:name>a.com</domain:name><clTRID>ABC-1</clTRID>', 1),
+    respond(b'<check><domain:name>a.com</domain:name><domain:name>b.com</domain:name>', 2),
+    respond(b'<delete><clTRID>ABC-2</clTRID>', 3).replace(b'1000', b'2303'),
+    b'<?xml version="1.0"?><!-- c --><epp xmlns="urn:ietf:params:xml:ns:epp-1.0"><response>'
+    b'<?pi x?><result code="1000"><msg lang="en">A &amp; <![CDATA[<b>]]> &#233;</msg>'
+    b'<!-- x --></result><msgQ count="1" id="5"><qDate>2020</qDate><msg>hi</msg></msgQ>'
+    b'<resData><contact:infData xmlns:contact="urn:ietf:params:xml:ns:contact-1.0">'
+    b'<contact:id>c1</contact:id><contact:postalInfo type="int"><contact:name>N</contact:name>'
+    b'<contact:addr><contact:street>s1</contact:street><contact:street>s2</contact:street>'
+    b'<contact:cc>US</contact:cc></contact:addr></contact:postalInfo>'
+    b'<contact:voice x="1">+1.1</contact:voice></contact:infData></resData>'
+    b'<extension><foo:bar xmlns:foo="urn:x:foo" xml:lang="fr"><foo:baz/></foo:bar></extension>'
+    b'<trID><clTRID>x</clTRID><svTRID>y</svTRID></trID></response></epp>',
+    u'<?xml version="1.0" encoding="UTF-8"?><epp xmlns="urn:ietf:params:xml:ns:epp-1.0">'
+    u'<response><result code="1000"><msg>\xe9t\xe9 \u2603</msg></result>'
+    u'<trID><svTRID>z</svTRID></trID></response></epp>'.encode('utf-8'),
+    # text, whatever its declaration says
+    u'<?xml version="1.0" encoding="UTF-8"?><epp xmlns="urn:ietf:params:xml:ns:epp-1.0">'
+    u'<response><result code="1000"><msg>\xe9t\xe9 \u2603</msg></result>'
+    u'<trID><svTRID>z</svTRID></trID></response></epp>',
+    u'<?xml version="1.0" encoding="ISO-8859-1"?><epp xmlns="urn:ietf:params:xml:ns:epp-1.0">'
+    u'<response><result code="1000"><msg>\xe9t\xe9</msg></result>'
+    u'<trID><svTRID>z</svTRID></trID></response></epp>',
+]
+
+
+def _raw(buf):
+    # what the client reads: frame bytes (in the declared encoding), as memoryviews
+    if isinstance(buf, text_type):
+        buf = buf.encode(re.search(r'encoding="([^"]+)"', buf).group(1))
+    return memoryview(buf)
+
+
+@contextmanager
+def using(name):
+    previous = xmlbackend.get_backend().name
+    try:
+        yield xmlbackend.set_backend(name)
+    finally:
+        xmlbackend.set_backend(previous)
+
+
+@pytest.fixture(params=['stdlib', 'lxml'])
+def backend(request):
+    with using(request.param) as selected:
+        yield selected
+
+
+def _parse_all(name, **kwargs):
+    with using(name):
+        return [EppResponse.from_xml(buf, **kwargs) for buf in CORPUS]
+
+
+def _tree(elem):
+    return (elem.tag, sorted(elem.attrib.items()), elem.text, elem.tail,
+            [_tree(child) for child in elem])
+
+
+@pytest.mark.parametrize('strip_hints', [True, False])
+@pytest.mark.parametrize('lazy', [False, True])
+def test_responses_identical(strip_hints, lazy):
+    stdlib, lxml = [_parse_all(name, strip_hints=strip_hints, lazy=lazy)
+                    for name in ('stdlib', 'lxml')]
+    for ours, theirs in zip(stdlib, lxml):
+        assert ours.to_xml(force_prefix=False) == theirs.to_xml(force_prefix=False)
+        assert ours.to_xml(force_prefix=True, pretty=False) == \
+            theirs.to_xml(force_prefix=True, pretty=False)
+        assert ours.unwrap() == theirs.unwrap()
+
+
+@pytest.mark.parametrize('buf', CORPUS)
+def test_trees_identical(buf):
+    trees = []
+    for name in ('stdlib', 'lxml'):
+        with using(name) as selected:
+            trees.append(_tree(selected.fromstring(buf)))
+            trees.append(_tree(selected.fromstring(_raw(buf))))
+    assert trees[0] == trees[1] == trees[2] == trees[3]
+
+
+@pytest.mark.parametrize('buf', CORPUS)
+def test_feed_parser(backend, buf):
+    parser = backend.feed_parser()
+    view = _raw(buf)
+    for pos in range(0, len(view), 7):
+        parser.feed(view[pos:pos + 7])
+    assert _tree(parser.close()) == _tree(backend.fromstring(buf))
+
+
+@pytest.mark.parametrize('buf', CORPUS[1:4])
+def test_records_identical(buf):
+    out = []
+    for name in ('stdlib', 'lxml'):
+        with using(name):
+            resp = decode_response(buf)
+        out.append((resp.code, resp.cltrid, resp.svtrid, resp.msg, resp.records))
+    assert out[0] == out[1]
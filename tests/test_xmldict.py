@@ -0,0 +1,104 @@
+from xml.etree import ElementTree
+
+import pytest
+
+from eppy import doc, xmldict
+from eppy.doc import EppCreateDomainCommand, EppResponse, dpath_get
+
+from conftest import respond
+
+
+def test_caches_are_bounded():
+    buf = respond(b'<info><domain:name>a.com</domain:name><clTRID>ABC-1</clTRID>', 1)
+    expected = EppResponse.from_xml(buf).unwrap()
+    for idx in range(300):
+        resp = EppResponse.from_xml(buf, extra_nsmap={'ext%d' % idx: 'urn:x:ext-%d' % idx})
+        assert resp.unwrap() == expected
+    # pylint: disable=protected-access
+    assert len(xmldict._NSMAP_R_CACHE) <= 256
+    assert len(xmldict._TAG_CACHES) <= 256
+
+
+def test_multi_nodes_read_when_parsing():
+    buf = respond(b'<info><domain:name>a.com</domain:name><clTRID>ABC-1</clTRID>', 1)
+    path = ('epp', 'response', 'resData', 'domain:infData', 'roid')
+    assert EppResponse.from_xml(buf).resData['domain:infData']['roid'] == 'R1'
+    EppResponse._multi_nodes.add(path)  # pylint: disable=protected-access
+    try:
+        assert EppResponse.from_xml(buf).resData['domain:infData']['roid'] == ['R1']
+        assert EppResponse.from_xml(buf, lazy=True).resData['domain:infData']['roid'] == ['R1']
+    finally:
+        EppResponse._multi_nodes.discard(path)  # pylint: disable=protected-access
+
+
+class _Mixin(object):
+    pass
+
+
+def test_plan_with_mixin_first():
+    class MixedCreateDomainCommand(_Mixin, EppCreateDomainCommand):
+        pass
+
+    # pylint: disable=protected-access
+    assert MixedCreateDomainCommand._plan.levels == EppCreateDomainCommand._plan.levels
+    assert MixedCreateDomainCommand._plan.levels
+    docs = []
+    for cls in (EppCreateDomainCommand, MixedCreateDomainCommand):
+        cmd = cls()
+        cmd.name = 'example.com'
+        cmd.period = {'@unit': 'y', '_text': 1}
+        cmd.authInfo = {'pw': 'secret'}
+        cmd['epp']['command']['clTRID'] = 'ABC-1'
+        docs.append(cmd.to_xml(force_prefix=True))
+    assert docs[0] == docs[1]
+
+
+COMMAND_ARGS = {
+    doc.EppPollCommand: ('ack', '42'),
+    doc.EppTransferCommand: ('request',),
+    doc.EppTransferDomainCommand: ('request',),
+    doc.EppTransferContactCommand: ('query',),
+}
+
+COMMAND_DATA = {
+    'domain': {
+        'name': u'\u00e9xample.com',
+        'period': {'@unit': 'y', '_text': '2'},
+        'ns': {'hostObj': ['ns1.example.net', 'ns2.example.net']},
+        'registrant': 'reg1',
+        'contact': [{'@type': 'admin', '_text': 'adm'}, {'@type': 'tech', '_text': 'tech'}],
+        'authInfo': {'pw': 's&cr<t>"'},
+    },
+    'host': {
+        'name': 'ns1.example.com',
+        'addr': [{'@ip': 'v4', '_text': '192.0.2.1'}, {'@ip': 'v6', '_text': '2001:db8::1'}],
+    },
+    'contact': {
+        'id': 'C1',
+        'postalInfo': {'@type': 'int', 'name': u'J\u00fcrgen', 'addr': {'city': 'Berlin', 'cc': 'DE'}},
+        'email': 'jd@example.com',
+        'authInfo': {'pw': 'secret'},
+    },
+}
+
+
+def _command_classes():
+    for cls in sorted(vars(doc).values(), key=str):
+        if isinstance(cls, type) and issubclass(cls, doc.EppCommand):
+            yield cls
+
+
+@pytest.mark.parametrize('cls', list(_command_classes()), ids=lambda cls: cls.__name__)
+@pytest.mark.parametrize('force_prefix', [False, True])
+def test_dict2bytes_matches_tree(cls, force_prefix):
+    cmd = cls(*COMMAND_ARGS.get(cls, ()))
+    # pylint: disable=protected-access
+    obj = cls._path[-1].partition(':')[0]
+    if obj in COMMAND_DATA:
+        dpath_get(cmd, cls._path).update(COMMAND_DATA[obj])
+    cmd['epp']['command']['clTRID'] = 'ABC-1'
+    childorder = cls._plan.childorder
+    tree = xmldict.dict2xml(cmd, childorder, force_prefix=force_prefix)
+    xmldict.indent(tree)
+    assert xmldict.dict2bytes(cmd, childorder, force_prefix=force_prefix) == \
+        ElementTree.tostring(tree)